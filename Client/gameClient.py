@@ -2,7 +2,6 @@
 
 import treys
 import pygame
-import pickle
 import time
 import os
 
@@ -138,27 +137,13 @@ def get_user_input(screen, prompt="Enter amount:"):
     return user_text
 
 
-def fetch_game_state(network):
-    """
-    Sunucuya 'get_state' isteği gönderir ve cevabı döndürür.
-    """
-    try:
-        request = {"action": "get_state"}
-        response = network.send(pickle.dumps(request))
-        return response
-    except Exception as e:
-        print(f"Error fetching game state: {e}")
-    return None
-
-
-def sync_state(players, buttons, network):
+def apply_state(players, buttons, state):
     """
     Sunucudan gelen state'e göre pot, valid_actions, community_cards, my_cards vb. günceller.
     """
     global POT, FULL_DECK, COMMUNITY_CARDS, MY_CARDS
 
-    state = fetch_game_state(network)
-    if state:
+    if state and 'error' not in state:
         POT = state.get('pot', 0)
 
         valid_actions = state.get('valid_actions', [])
@@ -265,9 +250,8 @@ def handle_action(action, network, screen=None):
             "move": action,
             "amount": amount
         }
-        response = network.send(pickle.dumps(data_to_send))
-        if response:
-            print("Action response:", response)
+        # Yeni state sunucu tarafından push edilir (main döngüsündeki poll)
+        network.post(data_to_send)
 
     except Exception as e:
         print(f"Error sending action: {e}")
@@ -327,16 +311,16 @@ def main():
 
     clock = pygame.time.Clock()
     running = True
-    last_sync_time = pygame.time.get_ticks()
+
+    # Polling yerine: sunucu her değişiklikte state'i push eder
+    network.subscribe()
 
     while running:
         screen.blit(table_image, (0, 0))
 
-        # Belirli aralıklarla senkronizasyon
-        current_time = pygame.time.get_ticks()
-        if current_time - last_sync_time > 2000:
-            sync_state(players, buttons, network)
-            last_sync_time = current_time
+        # Push edilen state güncellemelerini uygula
+        for state in network.poll():
+            apply_state(players, buttons, state)
 
         # Oyuncuları çiz
         for p in players:
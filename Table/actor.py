@@ -0,0 +1,95 @@
+import threading
+from collections import deque, namedtuple
+from concurrent.futures import Future, ThreadPoolExecutor
+from protocol import encode
+
+
+class TableSnapshot(namedtuple("TableSnapshot", ["version", "states", "payloads"])):
+    """Read-only view of a table published after every command: the game version and the
+    rendered state of every seat (a tuple indexed by player_id). Readers never touch the game.
+    """
+    __slots__ = ()
+
+    def payload(self, player_id):
+        """The seat's state encoded for the wire, encoded at most once per snapshot."""
+        payload = self.payloads[player_id]
+        if payload is None:
+            # Racing threads may both encode; they store identical bytes
+            payload = self.payloads[player_id] = encode(self.states[player_id])
+        return payload
+
+MAX_BATCH = 32  # Commands one table may run before yielding its worker to other tables
+
+
+class TableActor:
+    """Single writer for one PokerGame.
+
+    Commands are queued in the table's mailbox and executed strictly in order, one at a
+    time, on a worker thread borrowed from a pool shared by all tables. A table with a
+    long queue gives its worker back every MAX_BATCH commands, so a busy table cannot
+    starve the others.
+    """
+
+    def __init__(self, game, executor, on_change=None, table_id=None):
+        self.game = game
+        self.table_id = table_id  # game_id stamped on rendered states so clients can tell tables apart
+        self.executor = executor
+        self.on_change = on_change  # Called with the new snapshot after every change
+        self.mailbox = deque()
+        self.lock = threading.Lock()  # Guards mailbox and scheduled only, never the game
+        self.scheduled = False
+        self.snapshot = self._render()
+
+    def _render(self):
+        game = self.game
+        states = []
+        for player_id in range(len(game.players)):
+            state = game.get_player_state(player_id)
+            if self.table_id is not None:
+                state = dict(state, game_id=self.table_id, player_id=player_id)
+            states.append(state)
+        return TableSnapshot(game.version, tuple(states), [None] * len(states))
+
+    def submit(self, command, *args):
+        """Queue command(game, *args); returns a Future with its result."""
+        future = Future()
+        with self.lock:
+            self.mailbox.append((command, args, future))
+            if self.scheduled:
+                return future
+            self.scheduled = True
+        self.executor.submit(self._drain)
+        return future
+
+    def _drain(self):
+        for _ in range(MAX_BATCH):
+            with self.lock:
+                if not self.mailbox:
+                    self.scheduled = False
+                    return
+                command, args, future = self.mailbox.popleft()
+
+            try:
+                result = command(self.game, *args)
+            except Exception as e:
+                result = e
+            if self.game.version != self.snapshot.version:
+                self.snapshot = self._render()
+                if self.on_change:
+                    try:
+                        self.on_change(self.snapshot)
+                    except Exception as e:
+                        print(f"Error publishing table snapshot: {e}")
+
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+        # Still busy: requeue behind whatever other tables are waiting
+        self.executor.submit(self._drain)
+
+
+def create_pool(workers=None):
+    """Worker pool shared by every TableActor in the process."""
+    return ThreadPoolExecutor(max_workers=workers, thread_name_prefix="table")
@@ -0,0 +1,57 @@
+"""Memory used per idle table.
+
+    python bench_memory.py                        # 2 to 10 player tables, print a table
+    python bench_memory.py --tables 20000 --json results.json
+
+Builds many tables the way the server does (players created, cards dealt, blinds posted,
+nobody acting) and divides the memory tracemalloc sees allocated by the number of tables.
+Run it on two checkouts to compare representations.
+"""
+import argparse
+import json
+import platform
+import tracemalloc
+
+from poker import PokerGame, Player
+from bench_poker import TABLE_SIZES
+
+
+def bytes_per_table(num_players, tables):
+    PokerGame([Player("Warm up", 1000), Player("Warm up", 1000)])  # Import-time caches are not per table
+
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    games = [PokerGame([Player(f"Player {i+1}", 1000) for i in range(num_players)]) for _ in range(tables)]
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+
+    allocated = sum(stat.size_diff for stat in after.compare_to(before, 'filename'))
+    del games
+    return allocated / tables
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-table memory of PokerGame")
+    parser.add_argument("--players", nargs="+", type=int, default=list(TABLE_SIZES),
+                        help="table sizes to measure")
+    parser.add_argument("--tables", type=int, default=5000, help="tables built per size")
+    parser.add_argument("--json", metavar="PATH", help="write results as JSON")
+    args = parser.parse_args()
+
+    results = {n: bytes_per_table(n, args.tables) for n in args.players}
+
+    print(f"{'players':<10}{'bytes/table':>14}{'bytes/seat':>14}")
+    for n, size in results.items():
+        print(f"{n:<10}{size:>14,.0f}{size / n:>14,.0f}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({
+                'python': platform.python_version(),
+                'tables': args.tables,
+                'bytes_per_table': results,
+            }, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""Micro-benchmarks for the PokerGame hot paths.
+
+    python bench_poker.py                         # run everything, print a table
+    python bench_poker.py --json results.json     # also write machine-readable results
+    python bench_poker.py --save-baseline base.json
+    python bench_poker.py --baseline base.json    # exit code 1 on regressions
+
+Every case is timed one call at a time on a freshly prepared game (preparation is not
+timed) for 2 to 10 player tables, and the median and minimum are reported in microseconds.
+"""
+import argparse
+import json
+import platform
+import random
+import statistics
+import sys
+import time
+
+from poker import PokerGame, Player
+
+TABLE_SIZES = (2, 3, 6, 9, 10)
+
+
+def new_game(num_players):
+    return PokerGame([Player(f"Player {i+1}", 1000) for i in range(num_players)])
+
+
+def current(game):
+    return game.players[game.current_player]
+
+
+def advance_to_flop(game):
+    """Call/check around until the flop is dealt."""
+    while game.state == PokerGame.GameState.PRE_FLOP:
+        player = current(game)
+        move = PokerGame.Moves.CHECK if 'check' in game.get_valid_actions(player) else PokerGame.Moves.CALL
+        game.player_action(player, move)
+    return game
+
+
+def rendered(game):
+    game.get_player_state(0)
+    return game
+
+
+def at_river(game):
+    game.deal_community(5 - len(game.community_cards))
+    return game
+
+
+# name -> (prepare(num_players) returning the argument, timed function taking that argument)
+CASES = {
+    'init': (lambda n: [Player(f"Player {i+1}", 1000) for i in range(n)], PokerGame),
+    'start_new_round': (new_game, lambda g: g.start_new_round()),
+    'action_fold': (new_game, lambda g: g.player_action(current(g), PokerGame.Moves.FOLD)),
+    'action_call': (new_game, lambda g: g.player_action(current(g), PokerGame.Moves.CALL)),
+    'action_raise': (new_game, lambda g: g.player_action(current(g), PokerGame.Moves.RAISE,
+                                                         g.highest_bet + g.minimum_raise)),
+    'action_allin': (new_game, lambda g: g.player_action(current(g), PokerGame.Moves.ALLIN)),
+    'action_check': (lambda n: advance_to_flop(new_game(n)),
+                     lambda g: g.player_action(current(g), PokerGame.Moves.CHECK)),
+    'action_bet': (lambda n: advance_to_flop(new_game(n)),
+                   lambda g: g.player_action(current(g), PokerGame.Moves.BET, g.minimum_raise)),
+    'get_player_state': (new_game, lambda g: g.get_player_state(0)),
+    'get_player_state_cached': (lambda n: rendered(new_game(n)), lambda g: g.get_player_state(0)),
+    'evaluate': (lambda n: at_river(new_game(n)), lambda g: g.evaluate()),
+    'get_winner': (lambda n: at_river(new_game(n)), lambda g: g.get_winner()),
+}
+
+
+def run_case(prepare, func, num_players, samples):
+    timings = []
+    for _ in range(samples):
+        arg = prepare(num_players)
+        start = time.perf_counter_ns()
+        func(arg)
+        timings.append(time.perf_counter_ns() - start)
+    return {
+        'median_us': statistics.median(timings) / 1000,
+        'min_us': min(timings) / 1000,
+        'samples': samples,
+    }
+
+
+def run_all(selected, sizes, samples, seed):
+    random.seed(seed)  # FastDeck shuffles with the global random module by default
+    results = {}
+    for name in selected:
+        prepare, func = CASES[name]
+        for n in sizes:
+            results[f"{name}[{n}]"] = run_case(prepare, func, n, samples)
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Return (key, baseline median, current median) for every case slower than allowed."""
+    regressions = []
+    for key, result in results.items():
+        base = baseline.get(key)
+        if base and result['median_us'] > base['median_us'] * (1 + threshold):
+            regressions.append((key, base['median_us'], result['median_us']))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="PokerGame micro-benchmarks")
+    parser.add_argument("--cases", nargs="+", choices=sorted(CASES), default=list(CASES))
+    parser.add_argument("--players", nargs="+", type=int, default=list(TABLE_SIZES),
+                        help="table sizes to benchmark")
+    parser.add_argument("--samples", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", metavar="PATH", help="write results as JSON")
+    parser.add_argument("--save-baseline", metavar="PATH", help="store results as the new baseline")
+    parser.add_argument("--baseline", metavar="PATH", help="compare against a stored baseline")
+    parser.add_argument("--threshold", type=float, default=0.20,
+                        help="allowed slowdown of the median before a case counts as a regression")
+    args = parser.parse_args()
+
+    results = run_all(args.cases, args.players, args.samples, args.seed)
+    report = {
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'samples': args.samples,
+        'results': results,
+    }
+
+    print(f"{'case':<30}{'median us':>12}{'min us':>12}")
+    for key, r in results.items():
+        print(f"{key:<30}{r['median_us']:>12.2f}{r['min_us']:>12.2f}")
+
+    for path in (args.json, args.save_baseline):
+        if path:
+            with open(path, "w") as f:
+                json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)['results']
+        regressions = compare(results, baseline, args.threshold)
+        for key, before, after in regressions:
+            print(f"REGRESSION {key}: {before:.2f}us -> {after:.2f}us ({after / before - 1:+.0%})")
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""Compare the binary wire protocol against the old pickle encoding.
+
+    python bench_protocol.py [--rounds N] [--players N]
+"""
+import argparse
+import pickle
+import timeit
+
+import protocol
+from poker import PokerGame, Player
+
+
+def sample_messages(num_players):
+    players = [Player(f"Player {i+1}", 1000) for i in range(num_players)]
+    game = PokerGame(players)
+    # Play a few actions so the log and the board look like a real hand
+    for _ in range(num_players * 2):
+        player = game.players[game.current_player]
+        actions = game.get_valid_actions(player)
+        move = 'check' if 'check' in actions else 'call'
+        game.player_action(player, PokerGame.Moves[move.upper()])
+    seat = {"game_id": 0, "player_id": 0}
+    return {
+        'player_state': dict(game.get_player_state(0), **seat),
+        'player_action': dict({"action": "player_action", "move": "raise", "amount": 120}, **seat),
+        'get_state': dict({"action": "get_state", "since": game.version}, **seat),
+        'unchanged': dict({"unchanged": True, "version": game.version}, **seat),
+    }
+
+
+def bench(message, rounds):
+    encoded = protocol.encode(message)
+    pickled = pickle.dumps(message)
+    return {
+        'binary_bytes': len(encoded),
+        'pickle_bytes': len(pickled),
+        'binary_encode_us': timeit.timeit(lambda: protocol.encode(message), number=rounds) / rounds * 1e6,
+        'pickle_encode_us': timeit.timeit(lambda: pickle.dumps(message), number=rounds) / rounds * 1e6,
+        'binary_decode_us': timeit.timeit(lambda: protocol.decode(encoded), number=rounds) / rounds * 1e6,
+        'pickle_decode_us': timeit.timeit(lambda: pickle.loads(pickled), number=rounds) / rounds * 1e6,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=20000)
+    parser.add_argument("--players", type=int, default=2)
+    args = parser.parse_args()
+
+    print(f"{'message':<15}{'bytes bin/pkl':>16}{'encode us bin/pkl':>22}{'decode us bin/pkl':>22}")
+    for name, message in sample_messages(args.players).items():
+        r = bench(message, args.rounds)
+        assert protocol.decode(protocol.encode(message)) == message
+        print(f"{name:<15}"
+              f"{r['binary_bytes']:>8}/{r['pickle_bytes']:<7}"
+              f"{r['binary_encode_us']:>11.2f}/{r['pickle_encode_us']:<10.2f}"
+              f"{r['binary_decode_us']:>11.2f}/{r['pickle_decode_us']:<10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+"""Win/tie probabilities for a live hand.
+
+    results = estimate_equity([[As, Kd], [Qh, Qc]], board=[...])   # treys card ints
+    results = game_equity(game)                                     # {player name: result}
+
+Each result is a dict with 'win' and 'tie' (fraction of runouts the player wins outright or
+splits), 'equity' (expected share of the pot), its standard error 'stderr', the number of
+'samples' and whether the answer is 'exact'.
+
+When few enough runouts remain (flop, turn, river) they are all enumerated. Otherwise
+random runouts are dealt from the remaining deck in chunks spread over a process pool,
+until the iteration budget or time budget is used up or every player's equity is known to
+within target_stderr. Chunks are scored with batch_eval (NumPy) when it is installed and
+with the shared treys evaluator otherwise.
+"""
+import itertools
+import math
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+from treys import Card
+
+from evaluator import get_evaluator
+
+try:
+    import numpy as np
+    from batch_eval import get_batch_evaluator
+except ImportError:
+    np = None
+
+FULL_DECK = [Card.new(r + s) for r in "23456789TJQKA" for s in "shdc"]
+EXACT_LIMIT = 5000  # Enumerate every runout when there are at most this many
+CHUNK = 4000  # Random runouts per unit of work
+
+_pool = None
+_pool_workers = None
+
+
+def get_pool(workers=None):
+    """Process pool kept alive between calls so every street doesn't pay for start-up."""
+    global _pool, _pool_workers
+    workers = workers or os.cpu_count() or 1
+    if _pool is None or _pool_workers != workers:
+        if _pool is not None:
+            _pool.shutdown(wait=False)
+        _pool = ProcessPoolExecutor(max_workers=workers)
+        _pool_workers = workers
+    return _pool
+
+
+def _score(hands, board, runouts):
+    """Tally (share sum, share^2 sum, wins, ties) per player over a list of runouts."""
+    players = len(hands)
+    if np is not None:
+        runouts = np.asarray(runouts, dtype=np.int64).reshape(len(runouts), -1)
+        boards = np.concatenate([np.broadcast_to(np.asarray(board, dtype=np.int64), (len(runouts), len(board))),
+                                 runouts], axis=1)
+        batch = get_batch_evaluator()
+        ranks = np.stack([batch.evaluate(np.broadcast_to(np.asarray(h, dtype=np.int64), (len(boards), 2)), boards)
+                          for h in hands])
+        winners = ranks == ranks.min(axis=0)
+        counts = winners.sum(axis=0)
+        shares = winners / counts
+        return ((shares.sum(axis=1)).tolist(), ((shares ** 2).sum(axis=1)).tolist(),
+                (winners & (counts == 1)).sum(axis=1).tolist(), (winners & (counts > 1)).sum(axis=1).tolist())
+
+    evaluator = get_evaluator()
+    share_sum, share_sq, wins, ties = [0.0] * players, [0.0] * players, [0] * players, [0] * players
+    for runout in runouts:
+        full_board = list(board) + list(runout)
+        ranks = [evaluator.evaluate(list(h), full_board) for h in hands]
+        best = min(ranks)
+        winners = [i for i, r in enumerate(ranks) if r == best]
+        share = 1.0 / len(winners)
+        for i in winners:
+            share_sum[i] += share
+            share_sq[i] += share * share
+            if len(winners) == 1:
+                wins[i] += 1
+            else:
+                ties[i] += 1
+    return share_sum, share_sq, wins, ties
+
+
+def _simulate(hands, board, remaining, samples, seed):
+    """One chunk of random runouts (runs in a worker process)."""
+    need = 5 - len(board)
+    rng = random.Random(seed)
+    runouts = [rng.sample(remaining, need) for _ in range(samples)]
+    return samples, _score(hands, board, runouts)
+
+
+def _results(totals, samples, exact):
+    share_sum, share_sq, wins, ties = totals
+    results = []
+    for i in range(len(wins)):
+        mean = share_sum[i] / samples
+        variance = max(share_sq[i] / samples - mean * mean, 0.0)
+        results.append({
+            'win': wins[i] / samples,
+            'tie': ties[i] / samples,
+            'equity': mean,
+            'stderr': 0.0 if exact else math.sqrt(variance / samples),
+            'samples': samples,
+            'exact': exact,
+        })
+    return results
+
+
+def estimate_equity(hands, board=(), dead=(), iterations=100000, time_budget=None,
+                    target_stderr=None, workers=None, seed=None):
+    """Estimate each hand's chances against the others.
+
+    hands: list of two-card hands (treys ints), board: 0-5 community cards, dead: cards known
+    to be out of the deck. iterations/time_budget (seconds) cap the Monte Carlo run and
+    target_stderr stops it early once every equity is that precise. workers=0 runs in this
+    process instead of the pool.
+    """
+    hands = [list(h) for h in hands]
+    board = list(board)
+    known = set(board) | set(dead) | {c for h in hands for c in h}
+    remaining = [c for c in FULL_DECK if c not in known]
+    need = 5 - len(board)
+
+    if math.comb(len(remaining), need) <= EXACT_LIMIT:
+        runouts = list(itertools.combinations(remaining, need))
+        return _results(_score(hands, board, runouts), len(runouts), exact=True)
+
+    rng = random.Random(seed)
+    deadline = time.monotonic() + time_budget if time_budget else None
+    totals = [[0.0] * len(hands), [0.0] * len(hands), [0] * len(hands), [0] * len(hands)]
+    done = 0
+
+    def add(chunk):
+        nonlocal done
+        samples, tally = chunk
+        done += samples
+        for total, part in zip(totals, tally):
+            for i, value in enumerate(part):
+                total[i] += value
+
+    def finished():
+        if done >= iterations or (deadline and time.monotonic() >= deadline):
+            return True
+        if target_stderr and done:
+            return all(r['stderr'] <= target_stderr for r in _results(totals, done, exact=False))
+        return False
+
+    if workers == 0:
+        while not finished():
+            add(_simulate(hands, board, remaining, min(CHUNK, iterations - done), rng.getrandbits(32)))
+        return _results(totals, done, exact=False)
+
+    pool = get_pool(workers)
+    in_flight = set()
+    submitted = 0
+    while True:
+        # Keep every worker busy with one chunk, without submitting past the iteration budget
+        while len(in_flight) < _pool_workers and submitted < iterations:
+            size = min(CHUNK, iterations - submitted)
+            in_flight.add(pool.submit(_simulate, hands, board, remaining, size, rng.getrandbits(32)))
+            submitted += size
+        if not in_flight:
+            break
+        # Past the deadline, still wait for the first chunk so there is something to report
+        timeout = max(deadline - time.monotonic(), 0) if deadline and done else None
+        completed, in_flight = wait(in_flight, timeout=timeout, return_when=FIRST_COMPLETED)
+        for future in completed:
+            add(future.result())
+        if done and finished():
+            break
+
+    for future in in_flight:
+        future.cancel()
+    return _results(totals, done, exact=False)
+
+
+def game_equity(game, **kwargs):
+    """Equity of every player still in the hand of a PokerGame, keyed by player name."""
+    players = [p for p in game.players if not p.folded and p in game.hands]
+    results = estimate_equity([game.hands[p] for p in players], game.community_cards, **kwargs)
+    return {p.name: r for p, r in zip(players, results)}
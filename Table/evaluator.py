@@ -0,0 +1,95 @@
+"""Process-wide treys hand evaluator.
+
+treys.Evaluator() rebuilds its lookup tables (a few milliseconds) every time it is created.
+get_evaluator() builds them once per process and hands out the same instance afterwards.
+
+The tables can also be stored in a cache file that is memory-mapped on load, so server
+workers and clients started later skip generation entirely. The cache path comes from the
+cache_path argument or the POKER_LOOKUP_CACHE environment variable; if the file does not
+exist yet it is written after the tables are built.
+"""
+import mmap
+import os
+import struct
+import threading
+
+from treys import Evaluator
+from treys.lookup import LookupTable
+
+CACHE_ENV = "POKER_LOOKUP_CACHE"
+MAGIC = b"PKLT\x00\x00\x00\x01"
+HEADER = struct.Struct("=8sII")  # magic, flush entries, unsuited entries
+
+_evaluator = None
+_lock = threading.Lock()
+
+
+def save_tables(table, path):
+    """Write a LookupTable's two dicts to path (atomically, so readers never see half a file)."""
+    tables = [sorted(table.flush_lookup.items()), sorted(table.unsuited_lookup.items())]
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(HEADER.pack(MAGIC, len(tables[0]), len(tables[1])))
+        for items in tables:
+            f.write(struct.pack(f"={len(items)}I", *(k for k, _ in items)))
+        for items in tables:
+            f.write(struct.pack(f"={len(items)}H", *(v for _, v in items)))
+    os.replace(tmp, path)
+
+
+def load_tables(path):
+    """Map a file written by save_tables and rebuild the LookupTable from it."""
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        magic, n_flush, n_unsuited = HEADER.unpack_from(mm)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a lookup table cache")
+        view = memoryview(mm)
+        offset = HEADER.size
+        keys = []
+        for n in (n_flush, n_unsuited):
+            keys.append(view[offset:offset + 4 * n].cast("I"))
+            offset += 4 * n
+        values = []
+        for n in (n_flush, n_unsuited):
+            values.append(view[offset:offset + 2 * n].cast("H"))
+            offset += 2 * n
+
+        table = LookupTable.__new__(LookupTable)  # Skip generating the tables
+        table.flush_lookup = dict(zip(keys[0], values[0]))
+        table.unsuited_lookup = dict(zip(keys[1], values[1]))
+        for v in keys + values:
+            v.release()
+        view.release()
+    return table
+
+
+def _build(cache_path):
+    table = None
+    if cache_path and os.path.exists(cache_path):
+        try:
+            table = load_tables(cache_path)
+        except (OSError, ValueError, struct.error) as e:
+            print(f"Ignoring lookup table cache {cache_path}: {e}")
+
+    if table is None:
+        table = LookupTable()
+        if cache_path:
+            try:
+                save_tables(table, cache_path)
+            except OSError as e:
+                print(f"Could not write lookup table cache {cache_path}: {e}")
+
+    evaluator = Evaluator.__new__(Evaluator)
+    evaluator.table = table
+    evaluator.hand_size_map = {5: evaluator._five, 6: evaluator._six, 7: evaluator._seven}
+    return evaluator
+
+
+def get_evaluator(cache_path=None):
+    """The shared Evaluator, creating it on first use."""
+    global _evaluator
+    if _evaluator is None:
+        with _lock:
+            if _evaluator is None:
+                _evaluator = _build(cache_path or os.environ.get(CACHE_ENV))
+    return _evaluator
@@ -0,0 +1,121 @@
+"""Bounded, structured action log of a PokerGame.
+
+    log.append('raise', "Alice", 120)     # kind + arguments, nothing is formatted yet
+    log.recent(5)                         # last five events as text
+    events = log.since(cursor)            # Event(seq, kind, args) records, oldest first
+    cursor = log.cursor                   # sequence number the next event will get
+
+Events go into a ring buffer that grows as they arrive up to `capacity` slots, so an idle
+table holds only the few events of its first deal and one that runs for days at most
+`capacity` of them, and are only turned into text when someone reads them. Every event has
+a sequence number that keeps increasing for the life of the table; a client remembers the
+cursor it last saw and asks for the events since then instead of the whole log. If it fell
+more than `capacity` events behind, it simply gets the oldest events still kept.
+
+One thread (the table's actor) appends; any thread may read. Readers check each slot's
+sequence number, so an event overwritten while they read is skipped, never returned twice.
+"""
+from collections import namedtuple
+
+from treys import Card
+
+CAPACITY = 256  # Events kept per table
+
+
+def _cards(cards):
+    return [Card.int_to_str(c) for c in cards]
+
+
+# Event kind -> function formatting its arguments
+FORMATS = {
+    'small_blind': lambda name, amount: f"{name} posted small blind {amount}",
+    'big_blind': lambda name, amount: f"{name} posted big blind {amount}",
+    'fold': lambda name: f"{name} folded",
+    'check': lambda name: f"{name} checked",
+    'call': lambda name, amount: f"{name} called {amount}",
+    'raise': lambda name, amount: f"{name} raised to {amount}",
+    'bet': lambda name, amount: f"{name} bet {amount}",
+    'allin': lambda name, total: f"{name} is all-in for {total}",
+    'invalid': lambda name, reason: f"Invalid action by {name}: {reason}",
+    'board': lambda cards: f"Community cards: {_cards(cards)}",
+    'show': lambda name, cards: f"{name}'s hand: {' '.join(_cards(cards))}",
+    'win_default': lambda name, amount: f"{name} wins the pot of ${amount} by default (all others folded)",
+    'win_pot': lambda names, index, pots, amount: "{} {} {} of ${}".format(
+        " and ".join(names), "wins" if len(names) == 1 else "split",
+        "the pot" if pots == 1 else "the main pot" if index == 0 else f"side pot {index}", amount),
+    'bankrupt': lambda name: f"{name} is bankrupt and out of the game!",
+    'sit_down': lambda name: f"{name} sat down and plays from the next hand",
+    'new_round': lambda: "\n=== NEW ROUND ===",
+    'game_over': lambda: "=== GAME OVER ===",
+    'game_winner': lambda name, balance: f"{name} wins the game with ${balance}!",
+}
+
+
+class Event(namedtuple("Event", ["seq", "kind", "args"])):
+    __slots__ = ()
+
+    @property
+    def text(self):
+        return FORMATS[self.kind](*self.args)
+
+    def __str__(self):
+        return self.text
+
+
+class EventLog:
+    """Ring buffer of the last `capacity` events.
+
+    Iterating, indexing and slicing give formatted strings, like the plain list of strings
+    this replaces.
+    """
+    __slots__ = ('capacity', 'cursor', 'start', '_origin', '_slots')
+
+    def __init__(self, capacity=CAPACITY, cursor=0):
+        """cursor is the seq of the first event (non-zero for a log restored from a snapshot)."""
+        self.capacity = capacity
+        self.cursor = cursor  # seq of the next event
+        self.start = cursor  # seq of the oldest event not cleared
+        self._origin = cursor  # seq stored in slot 0
+        self._slots = []  # Grows to capacity, then wraps around
+
+    def append(self, kind, *args):
+        seq = self.cursor
+        slots = self._slots
+        if len(slots) < self.capacity:
+            slots.append(Event(seq, kind, args))
+        else:
+            slots[(seq - self._origin) % self.capacity] = Event(seq, kind, args)
+        self.cursor = seq + 1
+
+    def clear(self):
+        """Forget the events logged so far; sequence numbers keep counting."""
+        self.start = self.cursor
+
+    def _first(self):
+        return max(self.start, self.cursor - self.capacity)
+
+    def since(self, cursor, until=None):
+        """Events with cursor <= seq < until (default: all logged so far), oldest first."""
+        until = self.cursor if until is None else until
+        slots, capacity, origin = self._slots, self.capacity, self._origin
+        events = []
+        for seq in range(max(cursor, self._first()), until):
+            event = slots[(seq - origin) % capacity]
+            if event is not None and event.seq == seq:
+                events.append(event)
+        return events
+
+    def recent(self, count):
+        """The last count events as text."""
+        return [event.text for event in self.since(self.cursor - count)]
+
+    def __len__(self):
+        return self.cursor - self._first()
+
+    def __iter__(self):
+        return (event.text for event in self.since(self._first()))
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [event.text for event in self.since(self._first())[index]]
+        return self.since(self._first())[index].text
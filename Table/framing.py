@@ -0,0 +1,110 @@
+import asyncio
+import struct
+
+# Every message on the wire is a 4-byte big-endian length followed by that many payload bytes.
+HEADER = struct.Struct("!I")
+MAX_FRAME_SIZE = 16 * 1024 * 1024  # Refuse anything bigger than 16 MiB
+RECV_SIZE = 65536
+
+
+class FrameError(Exception):
+    pass
+
+
+def pack_frame(payload):
+    """Prefix a payload with its length header."""
+    if len(payload) > MAX_FRAME_SIZE:
+        raise FrameError(f"Frame of {len(payload)} bytes exceeds limit")
+    return HEADER.pack(len(payload)) + payload
+
+
+def send_frame(sock, payload):
+    sock.sendall(pack_frame(payload))
+
+
+class FrameReader:
+    """Buffers bytes from a socket and splits them into complete frames.
+
+    Partial frames stay in the buffer until the rest arrives, and several frames
+    received in one recv() are handed out one by one without another syscall.
+    """
+
+    def __init__(self, sock=None):
+        self.sock = sock
+        self.buffer = bytearray()
+
+    def feed(self, data):
+        """Add raw bytes (e.g. from a non-blocking recv) and return the frames now complete."""
+        self.buffer += data
+        return list(self._drain())
+
+    def _drain(self):
+        while len(self.buffer) >= HEADER.size:
+            (length,) = HEADER.unpack_from(self.buffer)
+            if length > MAX_FRAME_SIZE:
+                raise FrameError(f"Frame of {length} bytes exceeds limit")
+            end = HEADER.size + length
+            if len(self.buffer) < end:
+                return
+            payload = bytes(self.buffer[HEADER.size:end])
+            del self.buffer[:end]
+            yield payload
+
+    def has_frame(self):
+        if len(self.buffer) < HEADER.size:
+            return False
+        (length,) = HEADER.unpack_from(self.buffer)
+        return len(self.buffer) >= HEADER.size + length
+
+    def _fill(self):
+        data = self.sock.recv(RECV_SIZE)
+        if not data:
+            return False
+        self.buffer += data
+        return True
+
+    def read_frame(self):
+        """Block until one full frame is available. Returns None if the peer closed."""
+        while not self.has_frame():
+            if not self._fill():
+                return None
+        return next(self._drain())
+
+    def read_frames(self):
+        """Block until at least one frame is available and return every complete frame buffered.
+
+        Returns an empty list if the peer closed the connection.
+        """
+        while not self.has_frame():
+            if not self._fill():
+                return []
+        return list(self._drain())
+
+
+class FrameWriter:
+    """Collects outgoing frames and writes them with a single sendall()."""
+
+    def __init__(self, sock):
+        self.sock = sock
+        self.pending = []
+
+    def write(self, payload):
+        self.pending.append(pack_frame(payload))
+
+    def flush(self):
+        if self.pending:
+            data = b"".join(self.pending)
+            self.pending = []
+            self.sock.sendall(data)
+
+
+async def read_frame_async(reader):
+    """Read one frame from an asyncio StreamReader. Returns None on EOF."""
+    try:
+        header = await reader.readexactly(HEADER.size)
+        (length,) = HEADER.unpack(header)
+        if length > MAX_FRAME_SIZE:
+            raise FrameError(f"Frame of {length} bytes exceeds limit")
+        return await reader.readexactly(length)
+    except asyncio.IncompleteReadError:
+        return None
@@ -0,0 +1,188 @@
+"""Append-only hand history for audits and disputes.
+
+    log = HandLog("hands.log", fsync_interval=0.05)
+    game = PokerGame(players, history=HandRecorder(log, table_id))
+    ...
+    log.close()
+
+    python handlog.py hands.log [--table N]    # print the recorded hands
+
+A PokerGame with a recorder writes one record when a hand is dealt (stacks, blinds and
+hole cards), one per move made through player_action, one per street dealt by next_stage
+and one from get_winner with what every seat won. Records are small binary structs:
+
+    [u16 body length][u32 crc32 of body][body]
+    body = [u8 type][u32 table][u32 hand][fields...]
+
+Cards are one byte (0-51, rank * 4 + suit as in protocol.py, 0xFF = none). Appending only
+packs the record and puts it on a queue; a background thread writes everything queued in
+one write() and fsyncs every fsync_interval seconds (group commit), so many moves on many
+tables share one disk flush and the action path never waits for the disk. A crash loses at
+most the last interval; a torn record at the end of the file fails its checksum and
+reading stops there.
+"""
+import os
+import struct
+import threading
+import time
+import zlib
+from collections import deque
+
+from deck import FULL_DECK
+
+HEADER = struct.Struct("!HI")
+PREFIX = struct.Struct("!BII")  # type, table, hand
+
+HAND, ACTION, STREET, RESULT = 1, 2, 3, 4
+STAGES = ('pre-flop', 'flop', 'turn', 'river', 'showdown')
+MOVES = ('bet', 'call', 'raise', 'fold', 'check', 'all-in')
+NO_CARD = 0xFF
+CARD_CODES = {card: code for code, card in enumerate(FULL_DECK)}
+CARD_NAMES = [r + s for r in "23456789TJQKA" for s in "shdc"]
+
+HAND_FIELDS = struct.Struct("!dBB")  # time, dealer, seats; then SEAT_FIELDS per seat
+SEAT_FIELDS = struct.Struct("!IIBB")  # stack before blinds, blind posted, two hole cards
+ACTION_FIELDS = struct.Struct("!BBII")  # seat, move, chips put in, pot after
+RESULT_FIELDS = struct.Struct("!B")  # seats; then u32 won per seat
+
+
+class HandLog:
+    """Durable append-only file of records, written and fsynced in batches."""
+
+    def __init__(self, path, fsync_interval=0.05):
+        self.path = path
+        self.fsync_interval = fsync_interval
+        self.file = open(path, "ab", buffering=0)
+        self.queue = deque()  # Encoded records not yet written; append/popleft are thread-safe
+        self.commits = 0  # Group commits finished
+        self.committed = threading.Condition()
+        self.wake = threading.Event()
+        self.closed = False
+        self.writer = threading.Thread(target=self._run, name="hand-log", daemon=True)
+        self.writer.start()
+
+    def append(self, body):
+        self.queue.append(HEADER.pack(len(body), zlib.crc32(body)) + body)
+
+    def _commit(self):
+        batch = []
+        while self.queue:
+            batch.append(self.queue.popleft())
+        try:
+            if batch:
+                self.file.write(b"".join(batch))
+                os.fsync(self.file.fileno())
+        finally:
+            with self.committed:
+                self.commits += 1
+                self.committed.notify_all()
+
+    def _run(self):
+        while not self.closed:
+            self.wake.wait(self.fsync_interval)
+            self.wake.clear()
+            try:
+                self._commit()
+            except OSError as e:
+                print(f"Hand log write failed: {e}")
+        self._commit()
+
+    def flush(self, timeout=None):
+        """Wait until everything appended so far is on disk."""
+        with self.committed:
+            target = self.commits + 2  # The commit running now may have missed the latest records
+        self.wake.set()
+        with self.committed:
+            return self.committed.wait_for(lambda: self.commits >= target or self.closed, timeout)
+
+    def close(self):
+        self.closed = True
+        self.wake.set()
+        self.writer.join()
+        self.file.close()
+
+
+def _card(card):
+    return CARD_CODES.get(card, NO_CARD)
+
+
+class HandRecorder:
+    """Turns one table's game events into hand log records (see PokerGame.history)."""
+
+    def __init__(self, log, table_id):
+        self.log = log
+        self.table_id = table_id
+        self.hand = 0
+
+    def _prefix(self, kind):
+        return PREFIX.pack(kind, self.table_id, self.hand)
+
+    def hand_started(self, game):
+        """After the cards were dealt and the blinds posted."""
+        self.hand += 1
+        cards = game.hole_cards
+        seats = [SEAT_FIELDS.pack(balance + bet, bet, _card(cards[2 * seat]), _card(cards[2 * seat + 1]))
+                 for seat, (balance, bet) in enumerate(zip(game.balances, game.seat_bets))]
+        self.log.append(self._prefix(HAND) + HAND_FIELDS.pack(time.time(), game.turn, len(seats)) + b"".join(seats))
+
+    def action(self, game, seat, move, chips):
+        self.log.append(self._prefix(ACTION) + ACTION_FIELDS.pack(seat, MOVES.index(move.value), chips, game.pot))
+
+    def street(self, game, cards):
+        self.log.append(self._prefix(STREET) + bytes([STAGES.index(game.state.value), len(cards)])
+                        + bytes(map(_card, cards)))
+
+    def result(self, game, won):
+        self.log.append(self._prefix(RESULT) + RESULT_FIELDS.pack(len(won)) + struct.pack(f"!{len(won)}I", *won))
+
+
+def read_records(path):
+    """Yield (type, table, hand, fields dict) for every intact record in the file."""
+    with open(path, "rb") as f:
+        data = f.read()
+    offset = 0
+    while offset + HEADER.size <= len(data):
+        length, crc = HEADER.unpack_from(data, offset)
+        body = data[offset + HEADER.size:offset + HEADER.size + length]
+        if len(body) < length or zlib.crc32(body) != crc:
+            break  # Torn write at the end of the log
+        offset += HEADER.size + length
+        kind, table, hand = PREFIX.unpack_from(body)
+        pos = PREFIX.size
+        if kind == HAND:
+            started, dealer, n = HAND_FIELDS.unpack_from(body, pos)
+            pos += HAND_FIELDS.size
+            seats = [SEAT_FIELDS.unpack_from(body, pos + i * SEAT_FIELDS.size) for i in range(n)]
+            fields = {'time': started, 'dealer': dealer,
+                      'stacks': [s[0] for s in seats], 'blinds': [s[1] for s in seats],
+                      'cards': [[CARD_NAMES[c] for c in s[2:] if c != NO_CARD] for s in seats]}
+        elif kind == ACTION:
+            seat, move, chips, pot = ACTION_FIELDS.unpack_from(body, pos)
+            fields = {'seat': seat, 'move': MOVES[move], 'chips': chips, 'pot': pot}
+        elif kind == STREET:
+            stage, n = body[pos], body[pos + 1]
+            fields = {'stage': STAGES[stage], 'cards': [CARD_NAMES[c] for c in body[pos + 2:pos + 2 + n]]}
+        elif kind == RESULT:
+            (n,) = RESULT_FIELDS.unpack_from(body, pos)
+            fields = {'won': list(struct.unpack_from(f"!{n}I", body, pos + RESULT_FIELDS.size))}
+        else:
+            fields = {}
+        yield kind, table, hand, fields
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Print recorded hands")
+    parser.add_argument("path")
+    parser.add_argument("--table", type=int, help="only this table")
+    args = parser.parse_args()
+
+    names = {HAND: 'hand', ACTION: 'action', STREET: 'street', RESULT: 'result'}
+    for kind, table, hand, fields in read_records(args.path):
+        if args.table is None or table == args.table:
+            print(f"table {table} hand {hand} {names.get(kind, kind)}: {fields}")
+
+
+if __name__ == "__main__":
+    main()
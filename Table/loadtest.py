@@ -0,0 +1,223 @@
+"""Load test a running server with simulated players.
+
+    python loadtest.py --players 2000 --duration 30 [--seats-per-conn 4] [--policy random]
+
+Every bot speaks the real protocol (framing.py + protocol.py): it polls its seat with
+get_state and, when it is its turn, waits a random think time and sends a player_action
+chosen by the policy. At the end the tool prints throughput, p50/p99 latency per request
+type and error rates (or JSON with --json).
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from collections import defaultdict, deque
+
+from framing import pack_frame, read_frame_async
+from protocol import encode, decode
+import server
+
+
+def passive_policy(state, rng):
+    return ('check', 0) if 'check' in state['valid_actions'] else ('call', 0)
+
+
+def aggressive_policy(state, rng):
+    actions = state['valid_actions']
+    if 'raise' in actions:
+        return 'raise', state['current_bet'] + state['min_raise']
+    if 'bet' in actions:
+        return 'bet', state['min_raise']
+    return passive_policy(state, rng)
+
+
+def random_policy(state, rng):
+    move = rng.choice(state['valid_actions'])
+    if move == 'raise':
+        return move, state['current_bet'] + state['min_raise'] * rng.randint(1, 3)
+    if move == 'bet':
+        return move, state['min_raise'] * rng.randint(1, 3)
+    return move, 0
+
+
+POLICIES = {
+    'passive': passive_policy,
+    'aggressive': aggressive_policy,
+    'random': random_policy,
+}
+
+
+class Stats:
+    def __init__(self):
+        self.latencies = defaultdict(list)  # request type -> seconds
+        self.errors = defaultdict(int)
+        self.connect_failures = 0
+
+    def record(self, kind, seconds, ok):
+        self.latencies[kind].append(seconds)
+        if not ok:
+            self.errors[kind] += 1
+
+    def report(self, elapsed):
+        def percentile(values, p):
+            values = sorted(values)
+            return values[min(len(values) - 1, int(len(values) * p))] if values else 0.0
+
+        result = {
+            'elapsed_s': elapsed,
+            'connect_failures': self.connect_failures,
+            'actions_per_s': len(self.latencies['player_action']) / elapsed if elapsed else 0.0,
+            'requests': {},
+        }
+        for kind, values in sorted(self.latencies.items()):
+            result['requests'][kind] = {
+                'count': len(values),
+                'per_s': len(values) / elapsed if elapsed else 0.0,
+                'p50_ms': percentile(values, 0.50) * 1000,
+                'p99_ms': percentile(values, 0.99) * 1000,
+                'error_rate': self.errors[kind] / len(values),
+            }
+        return result
+
+
+class Connection:
+    """One socket shared by several seats; replies are matched to requests in order."""
+
+    def __init__(self, stats):
+        self.stats = stats
+        self.pending = deque()  # (future, request type, start time) per outstanding request
+        self.seats = []
+
+    async def open(self, host, port, seats):
+        self.reader, self.writer = await asyncio.open_connection(host, port)
+        self.writer.write(pack_frame(encode({"action": "join"})))  # Ask for the first seat
+        hello = decode(await read_frame_async(self.reader))
+        self.seats.append((hello['game_id'], hello['player_id']))
+        self.listener = asyncio.get_running_loop().create_task(self.listen())
+        for _ in range(seats - 1):
+            reply = await self.request({"action": "join"})
+            if reply.get('status') != 'ok':
+                break
+            self.seats.append((reply['game_id'], reply['player_id']))
+
+    async def listen(self):
+        try:
+            while True:
+                payload = await read_frame_async(self.reader)
+                if payload is None:
+                    break
+                future, kind, start = self.pending.popleft()
+                message = decode(payload)
+                self.stats.record(kind, time.perf_counter() - start, 'error' not in message)
+                future.set_result(message)
+        finally:
+            while self.pending:
+                future, kind, start = self.pending.popleft()
+                self.stats.record(kind, time.perf_counter() - start, False)
+                future.set_exception(ConnectionError("Connection closed"))
+
+    def request(self, data):
+        future = asyncio.get_running_loop().create_future()
+        self.pending.append((future, data['action'], time.perf_counter()))
+        self.writer.write(pack_frame(encode(data)))
+        return future
+
+    def close(self):
+        self.listener.cancel()
+        self.writer.close()
+
+
+async def play_seat(conn, seat, policy, think, poll, deadline, rng):
+    game_id, player_id = seat
+    ids = {"game_id": game_id, "player_id": player_id}
+    state = None
+    while time.monotonic() < deadline:
+        since = state['version'] if state else None
+        reply = await conn.request(dict({"action": "get_state", "since": since}, **ids))
+        if 'error' in reply:
+            await asyncio.sleep(poll)
+            continue
+        if not reply.get('unchanged'):
+            state = reply
+
+        if state['is_turn'] and state['valid_actions']:
+            await asyncio.sleep(rng.uniform(0, think))
+            move, amount = policy(state, rng)
+            state = await conn.request(dict({"action": "player_action", "move": move, "amount": amount}, **ids))
+            if 'error' in state:
+                state = None
+        else:
+            await asyncio.sleep(poll)
+
+
+async def run(args):
+    stats = Stats()
+    policy = POLICIES[args.policy]
+    connections = []
+    bots = []
+    loop = asyncio.get_running_loop()
+
+    remaining = args.players
+    while remaining > 0:
+        seats = min(args.seats_per_conn, remaining)
+        remaining -= seats
+        conn = Connection(stats)
+        try:
+            await conn.open(args.host, args.port, seats)
+        except Exception:
+            stats.connect_failures += 1
+            continue
+        connections.append(conn)
+
+    print(f"Connected {sum(len(c.seats) for c in connections)} seats on {len(connections)} connections")
+    start = time.monotonic()
+    deadline = start + args.duration
+    for conn in connections:
+        for seat in conn.seats:
+            rng = random.Random(args.seed * 1000003 + len(bots))
+            bots.append(loop.create_task(play_seat(conn, seat, policy, args.think, args.poll, deadline, rng)))
+
+    results = await asyncio.gather(*bots, return_exceptions=True)
+    elapsed = time.monotonic() - start
+    for conn in connections:
+        conn.close()
+
+    report = stats.report(elapsed)
+    report['bot_failures'] = sum(1 for r in results if isinstance(r, Exception))
+    return report
+
+
+def print_report(report):
+    print(f"\nDuration: {report['elapsed_s']:.1f}s  Actions/s: {report['actions_per_s']:.1f}  "
+          f"Connect failures: {report['connect_failures']}  Bot failures: {report['bot_failures']}")
+    print(f"{'request':<15}{'count':>10}{'per s':>10}{'p50 ms':>10}{'p99 ms':>10}{'errors':>9}")
+    for kind, r in report['requests'].items():
+        print(f"{kind:<15}{r['count']:>10}{r['per_s']:>10.1f}{r['p50_ms']:>10.2f}{r['p99_ms']:>10.2f}"
+              f"{r['error_rate']:>8.2%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the poker server with simulated players")
+    parser.add_argument("--host", default=server.server)
+    parser.add_argument("--port", type=int, default=server.port)
+    parser.add_argument("--players", type=int, default=100, help="number of simulated seats")
+    parser.add_argument("--seats-per-conn", type=int, default=1,
+                        help="seats multiplexed on each connection (needs join support)")
+    parser.add_argument("--duration", type=float, default=10, help="seconds to run")
+    parser.add_argument("--policy", choices=sorted(POLICIES), default="random")
+    parser.add_argument("--think", type=float, default=0.05, help="max think time before acting, seconds")
+    parser.add_argument("--poll", type=float, default=0.05, help="get_state interval while waiting, seconds")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+"""In-process metrics exposed in the Prometheus text format.
+
+    REQUESTS = registry.counter("poker_requests_total", "Requests handled", ("action",))
+    LATENCY = registry.histogram("poker_request_seconds", "Time to handle a request", ("action",))
+    registry.gauge("poker_tables", "Live tables", func=lambda: len(games))
+
+    REQUESTS.labels("get_state").inc()
+    LATENCY.labels("get_state").observe_ns(time.perf_counter_ns() - start)
+
+    serve_metrics(9100)        # GET http://127.0.0.1:9100/metrics
+
+Updating a metric is a couple of list/attribute operations with no locks, so it can stay
+on in the request path; resolve .labels(...) once where possible. Without locks, updates
+racing from two threads can very occasionally lose one increment, which is fine for
+monitoring. Gauges may take a function that is only called when the metrics are scraped.
+
+Histograms are HDR-style: values are kept in nanoseconds in log-linear buckets (eight per
+power of two, so any recorded value is known to within 12.5%) covering 1ns to hours, and
+quantile() reads percentiles from them. The exposition collapses them to one bucket per
+power of two from 1us up.
+"""
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+SUB_BUCKETS = 8  # Per power of two
+BUCKETS = 2 * SUB_BUCKETS + 40 * SUB_BUCKETS  # Up to 2**44 ns (a few hours)
+EXPORT_BOUNDS = [1 << k for k in range(10, 37)]  # 1.02us .. 68.7s, in ns
+
+
+def bucket_index(ns):
+    if ns < 2 * SUB_BUCKETS:
+        return max(ns, 0)
+    shift = ns.bit_length() - 4
+    return min(2 * SUB_BUCKETS + (shift - 1) * SUB_BUCKETS + (ns >> shift) - SUB_BUCKETS, BUCKETS - 1)
+
+
+def bucket_upper(index):
+    """Smallest value (ns) above the bucket."""
+    if index < 2 * SUB_BUCKETS:
+        return index + 1
+    shift, sub = divmod(index - 2 * SUB_BUCKETS, SUB_BUCKETS)
+    return (sub + SUB_BUCKETS + 1) << (shift + 1)
+
+
+class Counter:
+    __slots__ = ('value',)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount=1):
+        self.value += amount
+
+    def samples(self, name, labels):
+        yield name, labels, self.value
+
+
+class Gauge:
+    __slots__ = ('value', 'func')
+
+    def __init__(self, func=None):
+        self.value = 0
+        self.func = func  # Called at scrape time instead of storing a value
+
+    def set(self, value):
+        self.value = value
+
+    def inc(self, amount=1):
+        self.value += amount
+
+    def dec(self, amount=1):
+        self.value -= amount
+
+    def samples(self, name, labels):
+        yield name, labels, self.func() if self.func else self.value
+
+
+class Histogram:
+    __slots__ = ('counts', 'total_ns')
+
+    def __init__(self):
+        self.counts = [0] * BUCKETS
+        self.total_ns = 0
+
+    def observe_ns(self, ns):
+        self.counts[bucket_index(ns)] += 1
+        self.total_ns += ns
+
+    def observe(self, seconds):
+        self.observe_ns(int(seconds * 1e9))
+
+    def quantile(self, q):
+        """Upper bound in seconds of the bucket holding the q-th quantile (0 if empty)."""
+        counts = list(self.counts)
+        rank = q * sum(counts)
+        seen = 0
+        for index, count in enumerate(counts):
+            seen += count
+            if count and seen >= rank:
+                return bucket_upper(index) / 1e9
+        return 0.0
+
+    def samples(self, name, labels):
+        counts = list(self.counts)
+        cumulative = 0
+        index = 0
+        for bound in EXPORT_BOUNDS:
+            while index < BUCKETS and bucket_upper(index) <= bound:
+                cumulative += counts[index]
+                index += 1
+            yield f"{name}_bucket", labels + (('le', repr(bound / 1e9)),), cumulative
+        total = sum(counts)
+        yield f"{name}_bucket", labels + (('le', '+Inf'),), total
+        yield f"{name}_sum", labels, self.total_ns / 1e9
+        yield f"{name}_count", labels, total
+
+
+class Family:
+    """One metric name; with label names, one child metric per label value combination."""
+
+    def __init__(self, name, help, kind, label_names, make):
+        self.name = name
+        self.help = help
+        self.kind = kind
+        self.label_names = tuple(label_names)
+        self.make = make
+        self.children = {}
+        self.lock = threading.Lock()
+        if not self.label_names:
+            self.children[()] = make()
+
+    def labels(self, *values):
+        child = self.children.get(values)
+        if child is None:
+            with self.lock:
+                child = self.children.setdefault(values, self.make())
+        return child
+
+    def __getattr__(self, attr):
+        # Unlabelled families act as their single metric
+        return getattr(self.children[()], attr)
+
+    def expose(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for values, child in list(self.children.items()):
+            for name, labels, value in child.samples(self.name, tuple(zip(self.label_names, values))):
+                if labels:
+                    label_text = ",".join(f'{k}="{_escape(v)}"' for k, v in labels)
+                    lines.append(f"{name}{{{label_text}}} {value}")
+                else:
+                    lines.append(f"{name} {value}")
+        return lines
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class Registry:
+    def __init__(self):
+        self.families = {}
+
+    def _add(self, name, help, kind, label_names, make):
+        family = self.families.get(name)
+        if family is None:
+            family = self.families[name] = Family(name, help, kind, label_names, make)
+        return family
+
+    def counter(self, name, help, label_names=()):
+        return self._add(name, help, "counter", label_names, Counter)
+
+    def gauge(self, name, help, label_names=(), func=None):
+        return self._add(name, help, "gauge", label_names, lambda: Gauge(func))
+
+    def histogram(self, name, help, label_names=()):
+        return self._add(name, help, "histogram", label_names, Histogram)
+
+    def expose(self):
+        """All metrics in the Prometheus text exposition format."""
+        lines = []
+        for family in list(self.families.values()):
+            lines.extend(family.expose())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()  # Shared by the whole process
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/", "/metrics"):
+            self.send_error(404)
+            return
+        body = registry.expose().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # Scrapes every few seconds would flood the server output
+
+
+def serve_metrics(port, host="127.0.0.1"):
+    """Serve /metrics from a background thread; returns the HTTP server."""
+    httpd = ThreadingHTTPServer((host, port), MetricsHandler)
+    threading.Thread(target=httpd.serve_forever, name="metrics", daemon=True).start()
+    return httpd
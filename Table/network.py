@@ -1,5 +1,7 @@
+import select
 import socket
-import pickle
+from framing import FrameReader, send_frame
+from protocol import encode, decode
 
 
 class Network:
@@ -11,6 +13,8 @@ class Network:
         #self.server = "127.0.0.1"
         self.port = 43513
         self.addr = (self.server, self.port)
+        self.reader = FrameReader(self.client)
+        self.game_id = None
         self.p = self.connect()
 
     def getP(self):
@@ -21,9 +25,11 @@ class Network:
             # Attempt to connect
             self.client.connect(self.addr)
             print("Connected to server!")
+            send_frame(self.client, encode({"action": "join"}))  # Ask for a seat
 
             # Receive initial response
-            response = pickle.loads(self.client.recv(2048))
+            response = decode(self.reader.read_frame())
+            self.game_id = response.get("game_id")
             if response.get("status") != "ok":  # Check for valid server response
                 raise ConnectionError("Invalid server response")
 
@@ -37,11 +43,80 @@ class Network:
 
     def send(self, data):
         try:
-            # Send data without encoding (already pickled)
-            self.client.send(data)
+            send_frame(self.client, encode(data))
 
             # Receive and return response
-            return pickle.loads(self.client.recv(8192))  # Increased buffer size to 8192
-        except socket.error as e:
+            payload = self.reader.read_frame()
+            if payload is None:
+                raise ConnectionError("Server closed the connection")
+            return decode(payload)
+        except (socket.error, ConnectionError) as e:
             print(f"Socket error: {e}")
             return None
+
+    def join(self, stakes=None, table_size=None):
+        """Take one more seat on this same connection, at a table with the given stakes
+        (big blind) and size, or the server's defaults.
+
+        Returns (game_id, player_id); pass both in later requests to act on that seat.
+        """
+        response = self.send({"action": "join", "stakes": stakes, "table_size": table_size})
+        if response and response.get("status") == "ok":
+            return response["game_id"], response["player_id"]
+        print(f"Join failed: {response}")
+        return None
+
+    def reconnect(self):
+        """Open a new connection and ask for the seat we had before.
+
+        The server (or the sharded lobby, which routes it back to the worker running our
+        game) gives the seat back unless someone else holds it or the table is gone (its game
+        ended, or everyone left); returns None then.
+        """
+        self.client.close()
+        self.client = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.client.settimeout(15)
+        self.reader = FrameReader(self.client)
+        try:
+            self.client.connect(self.addr)
+            if self.game_id is not None and self.p is not None:
+                send_frame(self.client, encode({"action": "resume", "game_id": self.game_id, "player_id": self.p}))
+            else:
+                send_frame(self.client, encode({"action": "join"}))
+            response = decode(self.reader.read_frame())
+            if response.get("status") != "ok":
+                raise ConnectionError("Invalid server response")
+            self.game_id = response.get("game_id")
+            self.p = response.get("player_id")
+        except Exception as e:
+            print(f"Reconnect failed: {e}")
+            self.p = None
+        return self.p
+
+    def subscribe(self):
+        """Ask the server to push this seat's state after every change instead of polling."""
+        self.post({"action": "subscribe"})
+
+    def post(self, data):
+        """Send a request dict without waiting for a reply (replies arrive via poll)."""
+        try:
+            send_frame(self.client, encode(data))
+            return True
+        except socket.error as e:
+            print(f"Socket error: {e}")
+            return False
+
+    def poll(self, timeout=0):
+        """Return every message the server has pushed so far, waiting at most `timeout` seconds."""
+        # Frames that arrived together with an earlier reply are already buffered
+        messages = [decode(payload) for payload in self.reader.feed(b"")]
+        try:
+            while select.select([self.client], [], [], timeout)[0]:
+                data = self.client.recv(65536)
+                if not data:
+                    raise ConnectionError("Server closed the connection")
+                messages.extend(decode(payload) for payload in self.reader.feed(data))
+                timeout = 0
+        except (socket.error, ConnectionError) as e:
+            print(f"Socket error: {e}")
+        return messages
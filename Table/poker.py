@@ -1,19 +1,86 @@
 import random
 import time
+from array import array
+from collections.abc import Mapping
 from network import Network
 import pickle
 from enum import Enum
-from treys import Card, Deck, Evaluator  # pip install treys for this to work
+from treys import Card  # pip install treys for this to work
+from deck import FastDeck
+from evaluator import get_evaluator
+from eventlog import EventLog
+
+
+class SeatField:
+    """A Player attribute kept in its table's seat array once the player is seated."""
+
+    def __init__(self, table_attr, kind=int):
+        self.table_attr = table_attr
+        self.kind = kind
+
+    def __set_name__(self, owner, name):
+        self.slot = '_' + name
+
+    def __get__(self, player, owner=None):
+        if player is None:
+            return self
+        if player.table is None:
+            return getattr(player, self.slot)
+        return self.kind(getattr(player.table, self.table_attr)[player.seat])
+
+    def __set__(self, player, value):
+        if player.table is None:
+            setattr(player, self.slot, value)
+        else:
+            getattr(player.table, self.table_attr)[player.seat] = value
 
 
 class Player:
+    __slots__ = ('name', 'table', 'seat', '_balance', '_bankrupt', '_folded')
+
+    balance = SeatField('balances')
+    bankrupt = SeatField('bankrupt_flags', bool)
+    folded = SeatField('folded_flags', bool)
+
     def __init__(self, name, balance):
         self.name = name
+        self.table = None  # PokerGame this player is seated at
+        self.seat = None
         self.balance = balance
         self.bankrupt = False
         self.folded = False
 
 
+class SeatMap(Mapping):
+    """Read-only {player: value} view of one of a table's seat arrays."""
+
+    def __init__(self, game, get):
+        self.game = game
+        self.get_seat = get  # seat -> value, or None if that seat has no entry
+
+    def __getitem__(self, player):
+        seat = player.seat
+        if player.table is not self.game:
+            raise KeyError(player)
+        value = self.get_seat(seat)
+        if value is None:
+            raise KeyError(player)
+        return value
+
+    def __iter__(self):
+        return (p for p in self.game.players if self.get_seat(p.seat) is not None)
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def items(self):
+        pairs = zip(self.game.players, map(self.get_seat, range(len(self.game.players))))
+        return [(p, v) for p, v in pairs if v is not None]
+
+    def values(self):
+        return [v for v in map(self.get_seat, range(len(self.game.players))) if v is not None]
+
+
 class PokerGame:
     class GameState(Enum):
         PRE_FLOP = 'pre-flop'
@@ -30,87 +97,279 @@ class PokerGame:
         CHECK = 'check'
         ALLIN = 'all-in'
 
-    def __init__(self, players):
-        self.players = players
-        self.deck = Deck()
-        self.hands = {}  # Initialize empty hands dict
+    def __init__(self, players, seed=None, rng=None, history=None, big_blind=20):
+        """seed or rng (a random.Random) make the deal reproducible; by default cards come
+        from the global random module. history is a handlog.HandRecorder or None. The
+        table's stakes are its big blind; the small blind is half of it."""
+        self.history = history  # Records every hand for audits when set
+        self.seat_players(players)
+        self.version = 0  # Bumped on every change clients can see
+        self._seat_states = {}  # player_id -> rendered get_player_state, until the next change
+        self.deck = FastDeck(seed, rng)
         self.community_cards = []
         self.turn = 0  # Dealer position
         self.current_player = None  # Don't set this yet
-        self.small_blind = 10
-        self.big_blind = 20
-        self.minimum_raise = 20
+        self.small_blind = big_blind // 2
+        self.big_blind = big_blind
+        self.minimum_raise = big_blind
         self.pot = 0
-        self.bets = {player: 0 for player in players}
         self.last_raiser = None
         self.state = PokerGame.GameState.PRE_FLOP
-        self.action_log = []
+        self.action_log = EventLog()  # Last EventLog.capacity events; see eventlog.py
         self.round_complete = False
-        self.action_needed = {player: False for player in players}
         self.current_round_players = []
-        self.start_new_round()
-        self.initial_balances = {player: player.balance for player in players}
-
-        # Only deal cards and post blinds if we have enough players
-        if len(players) >= 2:
-            self.deal_initial_cards()
-            self.post_blinds()
-            # Set current_player after blinds are posted
-            self.current_player = (self.turn + 2) % len(self.players)  # Start with player after big blind
+        self.hands_played = 0  # Hands settled by get_winner
+
+        # Indexes kept up to date action by action instead of rescanning the table:
+        # active_count (players not folded), acting_count (of those, the ones not all-in),
+        # highest_bet (max of bets), to_act (acting players still owing an action) and
+        # next_active/prev_active (a circular list of the seats of acting players; a seat
+        # that folds or goes all-in keeps its own links so play can move on from it).
+        self.active_count = len(players)
+        self.acting_count = len(players)
+        self.highest_bet = 0
+        self.to_act = 0
+        self.next_active = []
+        self.prev_active = []
+        self._bet_counts = {}  # bet -> number of acting players with that bet this street
+        self._epoch = 0  # Bumped when everyone has to act again (new street, bet or raise)
+        self.start_new_round()  # Deals and posts blinds if there are enough players
+        self._initial_balances = array('q', self.balances)
+
+    def mark_changed(self):
+        """Bump the state version so clients holding an older snapshot know it is stale.
+
+        Every seat's state shows the version, pot and action log, so any change makes all
+        of the cached per-seat states stale.
+        """
+        self.version += 1
+        self._seat_states.clear()
+
+    def seat_players(self, players):
+        """Take over the players' balances and flags into per-seat arrays.
+
+        Everything the table tracks per player lives in flat arrays indexed by seat number
+        rather than in per-player objects and dicts, which keeps idle tables small.
+        Player.balance/bankrupt/folded read and write these arrays.
+        """
+        n = len(players)
+        self.players = players
+        self.balances = array('q', [p.balance for p in players])
+        self.bankrupt_flags = bytearray(p.bankrupt for p in players)
+        self.folded_flags = bytearray(p.folded for p in players)
+        self.all_in_flags = bytearray(n)
+        self.seat_bets = array('q', bytes(8 * n))
+        self.contributions = array('q', bytes(8 * n))  # Chips each seat put in the pot this hand
+        self.hole_cards = array('I', bytes(8 * n))  # Two cards per seat, 0 when not dealt
+        self._acted = array('q', bytes(8 * n))  # Last epoch each seat acted in
+        for seat, player in enumerate(players):
+            player.table = self
+            player.seat = seat
+
+    def replace_player(self, seat, player):
+        """Give seat to a new player, who sits out until the next hand is dealt.
+
+        Whoever held the seat folds out of the hand in progress and leaves with their cards
+        and chips; the newcomer brings their own balance and none of the old flags.
+        """
+        self.mark_changed()
+        leaver = self.players[seat]
+        if not self.folded_flags[seat] and self._hand(seat) and self.state != self.GameState.SHOWDOWN:
+            if self.current_player == seat:
+                self.player_action(leaver, self.Moves.FOLD)
+            else:
+                self._fold(seat)
+                self.action_log.append('fold', leaver.name)
+                if self.history:
+                    self.history.action(self, seat, self.Moves.FOLD, 0)
+                if self.is_betting_round_complete():
+                    self.next_stage()
+
+        balance = player.balance
+        leaver.table = None
+        player.table = self
+        player.seat = seat
+        self.players[seat] = player
+        if self.last_raiser is leaver:
+            self.last_raiser = player
+        self.balances[seat] = balance
+        self._initial_balances[seat] = balance
+        self.bankrupt_flags[seat] = False  # Still folded if a hand is in progress
+        self.hole_cards[2 * seat] = self.hole_cards[2 * seat + 1] = 0
+        self.action_log.append('sit_down', player.name)
+
+    @property
+    def bets(self):
+        """{player: chips bet this street}"""
+        return SeatMap(self, self.seat_bets.__getitem__)
+
+    @property
+    def hands(self):
+        """{player: hole cards} for the players dealt in this round."""
+        return SeatMap(self, self._hand)
+
+    @property
+    def initial_balances(self):
+        return SeatMap(self, self._initial_balances.__getitem__)
+
+    @property
+    def action_needed(self):
+        """Whether each player still has to act this street."""
+        return {p: self._can_act(i) and self._acted[i] < self._epoch for i, p in enumerate(self.players)}
+
+    @property
+    def game_over(self):
+        """Whether the last hand was settled and fewer than two players can play another."""
+        if self.state != self.GameState.SHOWDOWN or self.pot:
+            return False
+        return sum(balance > 0 and not bankrupt for balance, bankrupt in zip(self.balances, self.bankrupt_flags)) < 2
+
+    def _can_act(self, seat):
+        return not self.folded_flags[seat] and not self.all_in_flags[seat]
+
+    def _hand(self, seat):
+        cards = self.hole_cards[2 * seat:2 * seat + 2]
+        return list(cards) if cards[0] else None
+
+    def _clear_hands(self):
+        self.hole_cards = array('I', bytes(8 * len(self.players)))
+
+    def _link_seats(self):
+        """Rebuild the active-seat indexes after folded flags were cleared for a new round."""
+        n = len(self.players)
+        self.active_count = n
+        self.acting_count = n
+        self.all_in_flags = bytearray(n)
+        self.next_active = [(i + 1) % n for i in range(n)]
+        self.prev_active = [(i - 1) % n for i in range(n)]
+
+    def _unlink_seat(self, seat):
+        """Take a seat that can no longer act (folded or all-in) out of the acting list."""
+        self._mark_acted(seat)
+        self._count_bet(self.seat_bets[seat], -1)
+        self.acting_count -= 1
+        prev, nxt = self.prev_active[seat], self.next_active[seat]
+        self.next_active[prev] = nxt
+        self.prev_active[nxt] = prev
+
+    def _fold(self, seat):
+        if not self.all_in_flags[seat]:
+            self._unlink_seat(seat)
+        self.folded_flags[seat] = True
+        self.active_count -= 1
+
+    def _go_all_in(self, seat):
+        self._unlink_seat(seat)
+        self.all_in_flags[seat] = True
+
+    def _first_active_from(self, seat):
+        """seat if its player can still act, else the next acting seat after it."""
+        while not self._can_act(seat):
+            seat = self.next_active[seat]
+        return seat
+
+    def _count_bet(self, bet, delta):
+        count = self._bet_counts.get(bet, 0) + delta
+        if count:
+            self._bet_counts[bet] = count
+        else:
+            del self._bet_counts[bet]
+
+    def _reset_bets(self):
+        """Zero every bet at the start of a street or round."""
+        self.seat_bets = array('q', bytes(8 * len(self.players)))
+        self.highest_bet = 0
+        self._bet_counts = {0: self.acting_count} if self.acting_count else {}
+
+    def _require_action(self, exempt=()):
+        """Every acting player except those in exempt has to act again."""
+        self._epoch += 1
+        self.to_act = self.acting_count
+        for seat in exempt:
+            self._mark_acted(seat)
+
+    def _mark_acted(self, seat):
+        if self._acted[seat] < self._epoch and self._can_act(seat):
+            self.to_act -= 1
+        self._acted[seat] = self._epoch
+
+    def _clear_action(self):
+        """Nobody owes an action (between rounds, or before blinds are posted)."""
+        self._epoch += 1
+        self._acted = array('q', [self._epoch]) * len(self.players)
+        self.to_act = 0
 
     def start_new_round(self):
         """Initialize a new round of poker."""
+        self.mark_changed()
         # Reset deck and hands
-        self.deck = Deck()
-        self.hands = {}
+        self.deck.shuffle()
+        self._clear_hands()
         self.community_cards = []
         self.current_player = None
-        self.bets = {player: 0 for player in self.players}
         self.last_raiser = None
         self.pot = 0
+        self.contributions = array('q', bytes(8 * len(self.players)))
         self.state = self.GameState.PRE_FLOP
-        self.action_needed = {player: False for player in self.players}
         self.round_complete = False
 
         # Clear any folded status from previous round
-        for player in self.players:
-            player.folded = False
+        self.folded_flags = bytearray(len(self.players))
+        self._link_seats()
+        self._reset_bets()
+        for seat, bankrupt in enumerate(self.bankrupt_flags):
+            if bankrupt or self.balances[seat] == 0:
+                self._fold(seat)  # Players out of the game sit the hand out
+        self._clear_action()
 
         # Only deal cards and post blinds if we have enough players
-        if len([p for p in self.players if not p.bankrupt]) >= 2:
+        if len(self.players) - sum(self.bankrupt_flags) >= 2:
             self.deal_initial_cards()
             self.post_blinds()
+            if self.history:
+                self.history.hand_started(self)
             # Set current_player after blinds are posted
-            self.current_player = (self.turn + 3) % len(self.players)
+            if self.acting_count:
+                self.current_player = self._first_active_from(self.current_player)
+            if self.is_betting_round_complete():
+                self.next_stage()  # Nobody can act: the blinds put everyone all-in
 
     def deal_initial_cards(self):
         """Deal initial cards to all players."""
-        for player in self.players:
-            self.hands[player] = self.deck.draw(2)
+        self.hole_cards = array('I', self.deck.draw(2 * len(self.players)))  # Two cards per seat in turn
 
     def reset_round(self):
-        self.deck = Deck()
-        self.hands = {}
+        self.mark_changed()
+        self.deck.shuffle()
+        self._clear_hands()
         self.community_cards = []
-        self.bets = {player: 0 for player in self.players}
+        self._reset_bets()
         self.last_raiser = None
         self.round_complete = False
         self.state = PokerGame.GameState.PRE_FLOP
 
     def get_player_state(self, player_id):
-        """Returns game state specific to the given player."""
+        """Returns game state specific to the given player.
+
+        The state is rendered once and cached until the game next changes; every caller gets
+        the same dict, so copy it before adding or changing fields.
+        """
+        state = self._seat_states.get(player_id)
+        if state is None:
+            state = self._seat_states[player_id] = self._render_player_state(player_id)
+        return state
+
+    def _render_player_state(self, player_id):
         if player_id < 0 or player_id >= len(self.players):
             raise ValueError(f"Invalid player_id: {player_id}")
 
         player = self.players[player_id]
-        other_players = [p for p in self.players if p != player]
 
         # Check if game has enough non-bankrupt players to start
-        active_players = [p for p in self.players if not p.bankrupt]
-        if len(active_players) < 2:
+        if len(self.players) - sum(self.bankrupt_flags) < 2:
             return {
                 'player_name': player.name,
-                'player_balance': player.balance,
+                'player_balance': self.balances[player_id],
                 'player_cards': [],
                 'community_cards': [],
                 'other_players': [],
@@ -118,36 +377,43 @@ class PokerGame:
                 'current_bet': 0,
                 'min_raise': self.minimum_raise,
                 'player_bet': 0,
-                'game_stage': 'game_over' if player.bankrupt else 'waiting_for_players',
+                'game_stage': 'game_over' if self.bankrupt_flags[player_id] else 'waiting_for_players',
                 'valid_actions': [],
-                'action_log': self.action_log[-5:],
+                'action_log': self.action_log.recent(5),
+                'log_cursor': self.action_log.cursor,
                 'is_turn': False,
-                'current_player': None
+                'current_player': None,
+                'version': self.version
             }
 
         # Normal game state
+        is_turn = self.current_player == player_id
         return {
             'player_name': player.name,
-            'player_balance': player.balance,
-            'player_cards': [Card.int_to_str(c) for c in self.hands.get(player, [])],
+            'player_balance': self.balances[player_id],
+            'player_cards': [Card.int_to_str(c) for c in self._hand(player_id) or []],
             'community_cards': [Card.int_to_str(c) for c in self.community_cards],
             'other_players': [{
                 'name': p.name,
-                'balance': p.balance,
-                'bet': self.bets[p],
-                'folded': p.folded,
-                'bankrupt': p.bankrupt,
-                'cards': ['??', '??'] if not p.folded and not p.bankrupt else None
-            } for p in other_players],
+                'balance': balance,
+                'bet': bet,
+                'folded': folded == 1,
+                'bankrupt': bankrupt == 1,
+                'cards': ['??', '??'] if not folded and not bankrupt else None
+            } for p, balance, bet, folded, bankrupt in zip(self.players, self.balances, self.seat_bets,
+                                                           self.folded_flags, self.bankrupt_flags)
+              if p is not player],
             'pot': self.pot,
-            'current_bet': max(self.bets.values()),
+            'current_bet': self.highest_bet,
             'min_raise': self.minimum_raise,
-            'player_bet': self.bets[player],
+            'player_bet': self.seat_bets[player_id],
             'game_stage': self.state.value,
-            'valid_actions': self.get_valid_actions(player) if self.current_player is not None and player == self.players[self.current_player] else [],
-            'action_log': self.action_log[-5:],
-            'is_turn': self.current_player is not None and player == self.players[self.current_player],
-            'current_player': self.players[self.current_player].name if self.current_player is not None else None
+            'valid_actions': self.get_valid_actions(player) if is_turn else [],
+            'action_log': self.action_log.recent(5),
+            'log_cursor': self.action_log.cursor,
+            'is_turn': is_turn,
+            'current_player': self.players[self.current_player].name if self.current_player is not None else None,
+            'version': self.version
         }
 
     def gameStateJson(self):
@@ -162,79 +428,89 @@ class PokerGame:
             'pot': self.pot,
             'bets': {player.name: self.bets[player] for player in self.players},
             'state': self.state.value,
-            'action_log': self.action_log
+            'action_log': list(self.action_log),
+            'log_cursor': self.action_log.cursor
         }
 
     def playerCardsJson(self):
         return {player.name: [Card.int_to_str(c) for c in self.hands[player]] for player in self.players}
 
+    def _next_dealt_in(self, seat):
+        """The first seat after seat whose player was dealt into this hand."""
+        seat = (seat + 1) % len(self.players)
+        while self.folded_flags[seat]:
+            seat = (seat + 1) % len(self.players)
+        return seat
+
     def post_blinds(self):
-        # Post small blind
-        sb_player = self.players[(self.turn + 1) % len(self.players)]
-        self.place_bet(sb_player, self.small_blind)
-        self.action_log.append(f"{sb_player.name} posted small blind {self.small_blind}")
+        # Post small blind (seats sitting the hand out are skipped)
+        sb_seat = self._next_dealt_in(self.turn)
+        sb_player = self.players[sb_seat]
+        amount = min(self.small_blind, self.balances[sb_seat])  # Short stacks post all-in
+        self.place_bet(sb_player, amount)
+        self.action_log.append('small_blind', sb_player.name, amount)
 
         # Post big blind
-        bb_player = self.players[(self.turn + 2) % len(self.players)]
-        self.place_bet(bb_player, self.big_blind)
-        self.action_log.append(f"{bb_player.name} posted big blind {self.big_blind}")
+        bb_seat = self._next_dealt_in(sb_seat)
+        bb_player = self.players[bb_seat]
+        amount = min(self.big_blind, self.balances[bb_seat])
+        self.place_bet(bb_player, amount)
+        self.action_log.append('big_blind', bb_player.name, amount)
 
         # Set last raiser to big blind
         self.last_raiser = bb_player
 
         # Set initial action to player after big blind
-        self.current_player = (self.turn + 3) % len(self.players)
+        self.current_player = self._next_dealt_in(bb_seat)
 
-        # Mark all players as needing action except blinds
-        for player in self.players:
-            self.action_needed[player] = True
-        self.action_needed[sb_player] = False  # Will need to complete their blind
-        self.action_needed[bb_player] = False  # Already complete unless raised
+        # Mark all players as needing action except blinds: the small blind will need to
+        # complete their blind, the big blind is already complete unless raised
+        self._require_action(exempt=(sb_seat, bb_seat))
 
     def deal_community(self, count):
+        self.mark_changed()
         self.community_cards.extend(self.deck.draw(count))
 
     def player_action(self, player, action, amount=0):
-        if self.players[self.current_player] != player:
+        seat = self.current_player
+        if self.players[seat] != player:
             return False
 
-        if player.folded:
+        if not self._can_act(seat):
             return False
 
-        max_bet = max(self.bets.values())
-        current_bet = self.bets[player]
+        self.mark_changed()
+        max_bet = self.highest_bet
+        current_bet = self.seat_bets[seat]
+        contributed = self.contributions[seat]
 
         try:
             if action == self.Moves.FOLD:
-                player.folded = True
-                self.action_log.append(f"{player.name} folded")
-                self.action_needed[player] = False
+                self._fold(seat)
+                self.action_log.append('fold', player.name)
 
             elif action == self.Moves.CHECK:
                 if max_bet > current_bet:
                     raise ValueError("Cannot check when there are outstanding bets")
-                self.action_log.append(f"{player.name} checked")
-                self.action_needed[player] = False
+                self.action_log.append('check', player.name)
+                self._mark_acted(seat)
 
             elif action == self.Moves.CALL:
-                call_amount = max_bet - current_bet
+                call_amount = min(max_bet - current_bet, self.balances[seat])  # Calling for less is all-in
                 if call_amount > 0:
                     self.place_bet(player, call_amount)
-                    self.action_log.append(f"{player.name} called {call_amount}")
+                    self.action_log.append('call', player.name, call_amount)
                 else:
-                    self.action_log.append(f"{player.name} checked")
-                self.action_needed[player] = False
+                    self.action_log.append('check', player.name)
+                self._mark_acted(seat)
 
             elif action == self.Moves.RAISE:
                 if amount < max_bet + self.minimum_raise:
                     raise ValueError(f"Raise must be at least {max_bet + self.minimum_raise}")
                 self.place_bet(player, amount - current_bet)
-                self.action_log.append(f"{player.name} raised to {amount}")
+                self.action_log.append('raise', player.name, amount)
                 # Mark all players as needing action except raiser
-                for p in self.players:
-                    if not p.folded and p != player:
-                        self.action_needed[p] = True
-                self.action_needed[player] = False
+                self._require_action(exempt=(seat,))
                 self.last_raiser = player
 
             elif action == self.Moves.BET:
@@ -243,14 +519,25 @@ class PokerGame:
                 if amount < self.minimum_raise:
                     raise ValueError(f"Bet must be at least {self.minimum_raise}")
                 self.place_bet(player, amount)
-                self.action_log.append(f"{player.name} bet {amount}")
+                self.action_log.append('bet', player.name, amount)
                 # Mark all players as needing action except bettor
-                for p in self.players:
-                    if not p.folded and p != player:
-                        self.action_needed[p] = True
-                self.action_needed[player] = False
+                self._require_action(exempt=(seat,))
                 self.last_raiser = player
 
+            elif action == self.Moves.ALLIN:
+                self.place_bet(player, self.balances[seat])
+                total = self.seat_bets[seat]
+                self.action_log.append('allin', player.name, total)
+                if total > max_bet:
+                    # Counts as a raise: everyone else has to respond to it
+                    self._require_action(exempt=(seat,))
+                    self.last_raiser = player
+                else:
+                    self._mark_acted(seat)
+
+            if self.history:
+                self.history.action(self, seat, action, self.contributions[seat] - contributed)
+
             # Move to next player
             if self.is_betting_round_complete():
                 self.next_stage()
@@ -259,15 +546,14 @@ class PokerGame:
             return True
 
         except ValueError as e:
-            self.action_log.append(f"Invalid action by {player.name}: {str(e)}")
+            self.action_log.append('invalid', player.name, str(e))
             return False
 
     def sync_with_server(self):
         try:
             # Send request to get updated state
-            updated_state = self.network.send(pickle.dumps({"action": "get_state"}))
+            server_state = self.network.send({"action": "get_state"})
             # Update game state locally
-            server_state = pickle.loads(updated_state)
             self.pot = server_state['pot']
             self.bets = server_state['bets']
             self.community_cards = server_state['community_cards']
@@ -276,37 +562,46 @@ class PokerGame:
             print(f"Failed to sync with server: {e}")
 
     def evaluate(self):
-        evaluator = Evaluator()
+        evaluator = get_evaluator()
         scores = {}
-        for player, hand in self.hands.items():
-            if not player.folded:
+        for seat, player in enumerate(self.players):
+            hand = self._hand(seat)
+            if hand and not self.folded_flags[seat]:
                 score = evaluator.evaluate(hand, self.community_cards)
                 scores[player] = score
         return scores
 
+    @staticmethod
+    def evaluate_batch(hands, boards=None):
+        """Rank many hands at once with NumPy (see batch_eval.py); same scores as evaluate()."""
+        from batch_eval import evaluate_batch  # NumPy is only needed by callers of this
+        return evaluate_batch(hands, boards)
+
     def place_bet(self, player, amount):
-        if player.balance < amount:
+        """Move chips from a player to the pot; a player left with nothing is all-in."""
+        seat = player.seat
+        if self.balances[seat] < amount:
             raise ValueError("Insufficient balance to place bet.")
-        player.balance -= amount
-        self.bets[player] += amount
+        self.balances[seat] -= amount
+        bet = self.seat_bets[seat] + amount
+        if self._can_act(seat):
+            self._count_bet(self.seat_bets[seat], -1)
+            self._count_bet(bet, 1)
+        self.seat_bets[seat] = bet
+        if bet > self.highest_bet:
+            self.highest_bet = bet
+        self.contributions[seat] += amount
         self.pot += amount
+        if self.balances[seat] == 0 and self._can_act(seat):
+            self._go_all_in(seat)
 
     def next_player(self):
-        """Move to the next player who hasn't folded."""
-        active_players = [p for p in self.players if not p.folded]
-        if len(active_players) <= 1:
+        """Move to the next player who hasn't folded or gone all-in."""
+        if self.active_count <= 1 or not self.acting_count:
             self.round_complete = True
             return False
 
-        original_player = self.current_player
-        while True:
-            self.current_player = (self.current_player + 1) % len(self.players)
-            if not self.players[self.current_player].folded:
-                break
-            # If we've gone all the way around
-            if self.current_player == original_player:
-                self.round_complete = True
-                break
+        self.current_player = self.next_active[self.current_player]
 
         # Check if round is complete (we've reached the last raiser)
         if self.last_raiser and self.players[self.current_player] == self.last_raiser:
@@ -316,33 +611,44 @@ class PokerGame:
 
     def is_betting_round_complete(self):
         """Check if the current betting round is complete."""
-        active_players = [p for p in self.players if not p.folded]
-        if len(active_players) <= 1:
+        if self.active_count <= 1:
             return True
 
-        # Check if all active players have acted and bets are equal
-        all_bets_equal = len(set(self.bets[p] for p in active_players)) == 1
-        all_acted = not any(self.action_needed[p] for p in active_players)
-
-        return all_bets_equal and all_acted
+        # Check if all players who can still act have acted and matched the highest bet
+        # (players all-in for less are settled by side pots instead)
+        return self.to_act == 0 and self._bet_counts.keys() <= {self.highest_bet}
 
     def next_stage(self):
         """Progress to the next stage of the game."""
         if not self.is_betting_round_complete():
             return False
 
+        self.mark_changed()
+
         # Reset betting round
         self.last_raiser = None
-        for player in self.players:
-            self.bets[player] = 0
-            self.action_needed[player] = True
+        self._reset_bets()
+        self._require_action()
 
-        active_players = [p for p in self.players if not p.folded]
-        if len(active_players) <= 1:
+        if self.active_count <= 1:
             self.state = self.GameState.SHOWDOWN
             return True
 
-        # Move to next stage
+        # Move to next stage; with fewer than two players left who can bet, deal the rest
+        # of the board straight away
+        self._deal_street()
+        while self.acting_count < 2 and self.state != self.GameState.SHOWDOWN:
+            self._deal_street()
+        if self.state == self.GameState.SHOWDOWN:
+            return True
+
+        # Reset current player to first active player after dealer
+        self.current_player = self._first_active_from((self.turn + 1) % len(self.players))
+
+        return True
+
+    def _deal_street(self):
+        dealt = len(self.community_cards)
         if self.state == self.GameState.PRE_FLOP:
             self.deal_community(3)  # Flop
             self.state = self.GameState.FLOP
@@ -354,73 +660,118 @@ class PokerGame:
             self.state = self.GameState.RIVER
         elif self.state == self.GameState.RIVER:
             self.state = self.GameState.SHOWDOWN
-            return True
-
-        # Reset current player to first active player after dealer
-        self.current_player = (self.turn + 1) % len(self.players)
-        while self.players[self.current_player].folded:
-            self.current_player = (self.current_player + 1) % len(self.players)
-
-        return True
+        if self.history:
+            self.history.street(self, self.community_cards[dealt:])
 
     def check_game_end(self):
         """Check if the game should end and handle next round."""
+        self.mark_changed()
         # Count players with money
-        active_players = [p for p in self.players if p.balance > 0]
+        active_players = [p for p, balance in zip(self.players, self.balances) if balance > 0]
 
         if len(active_players) <= 1:
             # Game is over - one player has all the money
             winner = active_players[0] if active_players else None
-            self.action_log.append("=== GAME OVER ===")
+            self.action_log.append('game_over')
             if winner:
-                self.action_log.append(f"{winner.name} wins the game with ${winner.balance}!")
+                self.action_log.append('game_winner', winner.name, winner.balance)
             return True
 
         # Rotate dealer position for next round
         self.turn = (self.turn + 1) % len(self.players)
 
         # Mark players as bankrupt if they can't pay blinds
-        for player in self.players:
-            if player.balance < self.big_blind:
-                player.bankrupt = True
-                self.action_log.append(f"{player.name} is bankrupt and out of the game!")
+        for seat, player in enumerate(self.players):
+            if self.balances[seat] < self.big_blind and not self.bankrupt_flags[seat]:
+                self.bankrupt_flags[seat] = True
+                self.action_log.append('bankrupt', player.name)
 
         # Start new round if enough players remain
-        active_players = [p for p in self.players if not p.bankrupt]
+        active_players = [p for p, bankrupt in zip(self.players, self.bankrupt_flags) if not bankrupt]
         if len(active_players) >= 2:
-            self.action_log.append("\n=== NEW ROUND ===")
+            self.action_log.append('new_round')
             self.start_new_round()
+            if self.state == self.GameState.SHOWDOWN:
+                self.get_winner()  # Everyone was all-in on the blinds
             return False
         else:
-            self.action_log.append("=== GAME OVER ===")
+            self.action_log.append('game_over')
             if len(active_players) == 1:
-                self.action_log.append(f"{active_players[0].name} wins the game with ${active_players[0].balance}!")
+                self.action_log.append('game_winner', active_players[0].name, active_players[0].balance)
             return True
 
+    def build_pots(self):
+        """Split the chips put in this hand into the main pot and side pots.
+
+        Returns [amount, eligible seats] pairs, main pot first. Seats are walked once in
+        order of contribution: every player still in the hand closes a pot holding what
+        each seat put in up to that player's contribution, and only players who put in at
+        least that much can win it.
+        """
+        n = len(self.players)
+        order = sorted(range(n), key=self.contributions.__getitem__)
+        pots = []
+        level = amount = 0
+        for i, seat in enumerate(order):
+            contribution = self.contributions[seat]
+            amount += (contribution - level) * (n - i)  # Seats order[i:] all put in at least this much
+            level = contribution
+            if amount and not self.folded_flags[seat]:
+                pots.append([amount, [s for s in order[i:] if not self.folded_flags[s]]])
+                amount = 0
+        if amount and pots:
+            pots[-1][0] += amount  # Folded players put in more than anyone left in the hand
+        return pots
+
+    def _award(self, amount, seats):
+        """Split amount between seats; odd chips go to the first winners left of the dealer."""
+        n = len(self.players)
+        seats = sorted(seats, key=lambda s: (s - self.turn - 1) % n)
+        share, odd = divmod(amount, len(seats))
+        for i, seat in enumerate(seats):
+            self.balances[seat] += share + (i < odd)
+        return seats
+
     def get_winner(self):
-        """Determine the winner and handle pot distribution."""
-        active_players = [p for p in self.players if not p.folded]
+        """Determine the winner and handle pot distribution.
+
+        Every live hand is evaluated once; the main pot and each side pot then go to the
+        best hands among the players eligible for it, split evenly on ties. Returns the
+        (first) winner of the main pot.
+        """
+        self.mark_changed()
         winner = None
+        before = array('q', self.balances) if self.history else None
 
-        if len(active_players) == 1:
-            winner = active_players[0]
+        if self.active_count == 1:
+            winner = self.players[self.folded_flags.index(0)]
             winner.balance += self.pot
-            self.action_log.append(f"{winner.name} wins the pot of ${self.pot} by default (all others folded)")
+            self.action_log.append('win_default', winner.name, self.pot)
         else:
             scores = self.evaluate()
-            winner = min(scores, key=scores.get)
-            self.action_log.append(f"Community cards: {[Card.int_to_str(c) for c in self.community_cards]}")
+            self.action_log.append('board', tuple(self.community_cards))
 
             # Show all hands at showdown
-            for player, hand in self.hands.items():
-                if not player.folded:
-                    cards_str = [Card.int_to_str(c) for c in hand]
-                    self.action_log.append(f"{player.name}'s hand: {' '.join(cards_str)}")
-
-            winner.balance += self.pot
-            self.action_log.append(f"{winner.name} wins the pot of ${self.pot}")
-
+            for seat, player in enumerate(self.players):
+                hand = self._hand(seat)
+                if hand and not self.folded_flags[seat]:
+                    self.action_log.append('show', player.name, tuple(hand))
+
+            pots = self.build_pots()
+            for index, (amount, eligible) in enumerate(pots):
+                ranks = {seat: scores[self.players[seat]] for seat in eligible if self.players[seat] in scores}
+                best = min(ranks.values())
+                winners = self._award(amount, [seat for seat, rank in ranks.items() if rank == best])
+                if winner is None:
+                    winner = self.players[winners[0]]
+                names = tuple(self.players[seat].name for seat in winners)
+                self.action_log.append('win_pot', names, index, len(pots), amount)
+
+        if self.history:
+            self.history.result(self, [after - start for after, start in zip(self.balances, before)])
         self.pot = 0
+        self.contributions = array('q', bytes(8 * len(self.players)))
+        self.hands_played += 1
         self.check_game_end()
         return winner
 
@@ -428,20 +779,20 @@ class PokerGame:
         if not player == self.players[self.current_player]:
             return []
 
-        max_bet = max(self.bets.values())
-        current_bet = self.bets[player]
+        max_bet = self.highest_bet
+        current_bet = self.seat_bets[player.seat]
 
         if self.state == self.GameState.PRE_FLOP and player == self.players[(self.turn + 1) % len(self.players)]:
             # Small blind special case
-            return ['call', 'raise', 'fold']
+            return ['call', 'raise', 'fold', 'allin']
 
         if current_bet < max_bet:
-            return ['call', 'raise', 'fold']
+            return ['call', 'raise', 'fold', 'allin']
         else:
             if max_bet == 0:
-                return ['check', 'bet', 'fold']
+                return ['check', 'bet', 'fold', 'allin']
             else:
-                return ['check', 'raise', 'fold']
+                return ['check', 'raise', 'fold', 'allin']
 
     def get_player_decision(self, player):
         decision = [None]
@@ -473,7 +824,7 @@ class PokerGame:
         return decision
 
     def play(self):
-        while len([p for p in self.players if not p.folded]) > 1:
+        while self.active_count > 1:
             player = self.players[self.turn % len(self.players)]
             if player.folded:
                 self.turn += 1
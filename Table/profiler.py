@@ -0,0 +1,122 @@
+"""Opt-in profiling for the server: a sampling profiler and slow-request traces.
+
+    python server.py --profile-out server.folded [--profile]
+    kill -USR1 <server pid>          # start / stop sampling; stopping writes the file
+    python server.py --slow-ms 20 --slow-out slow.folded
+
+Both write "collapsed stack" lines (frame;frame;frame count), the format read by
+flamegraph.pl, speedscope and most other flame graph tools.
+
+SamplingProfiler wakes up every interval seconds, reads the current stack of every other
+thread with sys._current_frames() and counts each distinct stack. Nothing is hooked into
+the interpreter, so a running server pays only for the sampling thread, and nothing at
+all while it is off.
+
+SlowRequestTracer gets the timestamps the server takes around each request anyway and,
+for requests slower than the threshold, appends where the time went as
+slow;<action>;<decode|game|encode|send> <microseconds>, so their flame graph shows which
+phase slow requests spend their time in.
+"""
+import os
+import signal
+import sys
+import threading
+from collections import Counter
+
+DEFAULT_INTERVAL = 0.005  # Seconds between samples (200 Hz)
+
+
+def _frame_name(code):
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})".replace(";", ":")
+
+
+class SamplingProfiler:
+    def __init__(self, path, interval=DEFAULT_INTERVAL):
+        self.path = path
+        self.interval = interval
+        self.stacks = Counter()
+        self.thread = None
+        self.stopping = threading.Event()
+
+    @property
+    def running(self):
+        return self.thread is not None
+
+    def start(self):
+        if self.running:
+            return
+        self.stacks.clear()
+        self.stopping.clear()
+        self.thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """Stop sampling and write the collapsed stacks; returns the number of samples."""
+        if not self.running:
+            return 0
+        self.stopping.set()
+        self.thread.join()
+        self.thread = None
+        self.write()
+        return sum(self.stacks.values())
+
+    def toggle(self):
+        if self.running:
+            print(f"Profiler stopped: {self.stop()} samples written to {self.path}")
+        else:
+            self.start()
+            print(f"Profiler started ({1 / self.interval:.0f} samples/s)")
+
+    def _run(self):
+        me = threading.get_ident()
+        names = {}  # code object -> frame name
+        threads = {}  # thread ident -> root frame name
+        while not self.stopping.wait(self.interval):
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    name = names.get(code)
+                    if name is None:
+                        name = names[code] = _frame_name(code)
+                    stack.append(name)
+                    frame = frame.f_back
+                if ident not in threads:
+                    threads.update((t.ident, t.name.split("_")[0]) for t in threading.enumerate())  # table_3 -> table
+                stack.append(threads.get(ident, "thread"))
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def write(self):
+        with open(self.path, "w") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+class SlowRequestTracer:
+    """Append a phase breakdown of every request slower than threshold_ms to path."""
+
+    def __init__(self, path, threshold_ms):
+        self.path = path
+        self.threshold_ns = int(threshold_ms * 1e6)
+        self.lock = threading.Lock()
+        self.file = open(path, "a", buffering=1)
+
+    def record(self, timer, sent):
+        """timer is the server's RequestTimer; sent is when the reply left (perf_counter_ns)."""
+        if sent - timer.start < self.threshold_ns:
+            return
+        phases = (("decode", timer.decoded - timer.start), ("game", timer.handled - timer.decoded),
+                  ("encode", timer.encoded - timer.handled), ("send", sent - timer.encoded))
+        lines = "".join(f"slow;{timer.action};{phase} {max(ns // 1000, 1)}\n" for phase, ns in phases)
+        with self.lock:
+            self.file.write(lines)
+
+
+def install_toggle(profiler, signum=getattr(signal, "SIGUSR1", None)):
+    """Start/stop the profiler whenever the process receives signum (SIGUSR1, Unix only)."""
+    if signum is None:
+        return False
+    signal.signal(signum, lambda *_: threading.Thread(target=profiler.toggle, daemon=True).start())
+    return True
@@ -0,0 +1,383 @@
+import struct
+
+# Binary wire format for the messages exchanged between server and clients.
+#
+# Every payload (carried inside a framing.py frame) starts with two bytes:
+#   [protocol version][message type]
+# followed by the message's fields in schema order. Integers are fixed-width big-endian,
+# strings are utf-8 with a u16 length, cards are one byte (rank * 4 + suit, 0xFF = hidden)
+# with a one-byte count for card lists, and enums are the index of the value in their table.
+# Unlike pickle, decoding never constructs anything but plain dicts, lists, strings and ints.
+
+VERSION = 7
+
+
+class ProtocolError(Exception):
+    pass
+
+
+RANKS = "23456789TJQKA"
+SUITS = "shdc"
+CARD_NAMES = [r + s for r in RANKS for s in SUITS]
+CARD_CODES = {name: i for i, name in enumerate(CARD_NAMES)}
+HIDDEN_CARD = 0xFF
+
+GAME_STAGES = ('pre-flop', 'flop', 'turn', 'river', 'showdown', 'game_over', 'waiting_for_players')
+MOVES = ('bet', 'call', 'raise', 'fold', 'check', 'allin')
+
+
+COUNT = struct.Struct("!H")  # String lengths and list counts
+CARD_TEXT = {**dict(enumerate(CARD_NAMES)), HIDDEN_CARD: '??'}  # Wire code -> card name
+CARD_WIRE = {**CARD_CODES, '??': HIDDEN_CARD}  # Card name -> wire code
+
+
+class Codegen:
+    """Source of one compiled pack or unpack function.
+
+    Every field type emits straight-line code for its part of a schema, so encoding a
+    message runs one function with no per-field dispatch; constants (struct packers,
+    enum tables) are passed in as globals of the compiled function.
+    """
+
+    def __init__(self):
+        self.lines = []
+        self.constants = {}
+        self.count = 0
+
+    def var(self):
+        self.count += 1
+        return f"v{self.count}"
+
+    def const(self, value):
+        name = f"k{len(self.constants)}"
+        self.constants[name] = value
+        return name
+
+    def emit(self, indent, line):
+        self.lines.append("    " * indent + line)
+
+    def compile(self, signature):
+        source = f"def {signature}:\n" + "\n".join(self.lines or ["    pass"])
+        namespace = dict(self.constants)
+        exec(source, namespace)
+        return namespace[signature.split("(")[0]]
+
+
+class Scalar:
+    def __init__(self, fmt):
+        self.struct = struct.Struct("!" + fmt)
+
+    def emit_pack(self, g, expr, indent):
+        g.emit(indent, f"out += {g.const(self.struct.pack)}({expr})")
+
+    def emit_unpack(self, g, indent):
+        v = g.var()
+        g.emit(indent, f"{v}, = {g.const(self.struct.unpack_from)}(buf, offset)")
+        g.emit(indent, f"offset += {self.struct.size}")
+        return v
+
+
+class Bool(Scalar):
+    def __init__(self):
+        super().__init__("?")
+
+
+class Str:
+    def emit_pack(self, g, expr, indent):
+        data = g.var()
+        g.emit(indent, f"{data} = {expr}.encode('utf-8')")
+        g.emit(indent, f"out += {g.const(COUNT.pack)}(len({data}))")
+        g.emit(indent, f"out += {data}")
+
+    def emit_unpack(self, g, indent):
+        v, n = g.var(), g.var()
+        g.emit(indent, f"{n} = buf[offset] << 8 | buf[offset + 1]")
+        g.emit(indent, f"offset += 2 + {n}")
+        g.emit(indent, f"{v} = buf[offset - {n}:offset].decode()")
+        return v
+
+
+class Enum:
+    def __init__(self, values):
+        self.values = values
+        self.codes = {v: i for i, v in enumerate(values)}
+        self.byte_codes = (self.codes.__getitem__, values.__getitem__)  # One byte per value, see List
+
+    def emit_pack(self, g, expr, indent):
+        g.emit(indent, f"out.append({g.const(self.codes)}[{expr}])")
+
+    def emit_unpack(self, g, indent):
+        v = g.var()
+        g.emit(indent, f"{v} = {g.const(self.values)}[buf[offset]]")
+        g.emit(indent, "offset += 1")
+        return v
+
+
+class Card:
+    byte_codes = (CARD_WIRE.__getitem__, CARD_TEXT.__getitem__)
+
+    def emit_pack(self, g, expr, indent):
+        g.emit(indent, f"out.append({g.const(CARD_WIRE)}[{expr}])")
+
+    def emit_unpack(self, g, indent):
+        v = g.var()
+        g.emit(indent, f"{v} = {g.const(CARD_TEXT)}[buf[offset]]")
+        g.emit(indent, "offset += 1")
+        return v
+
+
+class List:
+    def __init__(self, item):
+        self.item = item
+
+    def emit_pack(self, g, expr, indent):
+        items, item = g.var(), g.var()
+        g.emit(indent, f"{items} = {expr}")
+        g.emit(indent, f"out += {g.const(COUNT.pack)}(len({items}))")
+        if hasattr(self.item, 'byte_codes'):
+            # Enums and cards are one byte each: convert the whole list in one call
+            g.emit(indent, f"out += bytes(map({g.const(self.item.byte_codes[0])}, {items}))")
+            return
+        g.emit(indent, f"for {item} in {items}:")
+        self.item.emit_pack(g, item, indent + 1)
+
+    def emit_unpack(self, g, indent):
+        v, n = g.var(), g.var()
+        g.emit(indent, f"{n} = buf[offset] << 8 | buf[offset + 1]")
+        if hasattr(self.item, 'byte_codes'):
+            g.emit(indent, f"offset += 2 + {n}")
+            g.emit(indent, f"{v} = list(map({g.const(self.item.byte_codes[1])}, buf[offset - {n}:offset]))")
+            return v
+        g.emit(indent, "offset += 2")
+        g.emit(indent, f"{v} = []")
+        g.emit(indent, f"for _ in range({n}):")
+        item = self.item.emit_unpack(g, indent + 1)
+        g.emit(indent + 1, f"{v}.append({item})")
+        return v
+
+
+class Optional:
+    def __init__(self, item):
+        self.item = item
+
+    def emit_pack(self, g, expr, indent):
+        value = g.var()
+        g.emit(indent, f"{value} = {expr}")
+        g.emit(indent, f"if {value} is None:")
+        g.emit(indent + 1, "out.append(0)")
+        g.emit(indent, "else:")
+        g.emit(indent + 1, "out.append(1)")
+        self.item.emit_pack(g, value, indent + 1)
+
+    def emit_unpack(self, g, indent):
+        v = g.var()
+        g.emit(indent, "offset += 1")
+        g.emit(indent, "if buf[offset - 1]:")
+        item = self.item.emit_unpack(g, indent + 1)
+        g.emit(indent + 1, f"{v} = {item}")
+        g.emit(indent, "else:")
+        g.emit(indent + 1, f"{v} = None")
+        return v
+
+
+class CardList:
+    """List of cards as a count byte followed by one byte per card."""
+
+    def emit_pack(self, g, expr, indent):
+        cards = g.var()
+        g.emit(indent, f"{cards} = {expr}")
+        g.emit(indent, f"out.append(len({cards}))")
+        g.emit(indent, f"out += bytes(map({g.const(Card.byte_codes[0])}, {cards}))")
+
+    def emit_unpack(self, g, indent):
+        v, n = g.var(), g.var()
+        g.emit(indent, f"{n} = buf[offset]")
+        g.emit(indent, f"offset += 1 + {n}")
+        g.emit(indent, f"{v} = list(map({g.const(Card.byte_codes[1])}, buf[offset - {n}:offset]))")
+        return v
+
+
+class Struct:
+    """Record with fields in a fixed order.
+
+    pack(value, out) and unpack(buf, offset) are generated for each schema when it is
+    defined (see Codegen), with nested records, lists and card lists inlined. Runs of
+    consecutive scalar fields are packed with a single struct.Struct call.
+    """
+
+    def __init__(self, fields):
+        self.fields = fields
+        self.steps = []
+        for name, kind in fields:
+            if isinstance(kind, Scalar) and self.steps and isinstance(self.steps[-1][1], struct.Struct):
+                names, packer = self.steps[-1]
+                self.steps[-1] = (names + (name,), struct.Struct(packer.format + kind.struct.format[1:]))
+            elif isinstance(kind, Scalar):
+                self.steps.append(((name,), kind.struct))
+            else:
+                self.steps.append((name, kind))
+
+        g = Codegen()
+        self.emit_pack(g, "value", 1)
+        self.pack = g.compile("pack(value, out)")
+        g = Codegen()
+        g.emit(1, f"return {self.emit_unpack(g, 1)}, offset")
+        self.unpack = g.compile("unpack(buf, offset)")
+
+    def emit_pack(self, g, expr, indent):
+        if not self.steps:
+            return
+        if expr.isidentifier():
+            value = expr
+        else:
+            value = g.var()
+            g.emit(indent, f"{value} = {expr}")
+        for name, kind in self.steps:
+            if isinstance(kind, struct.Struct):
+                args = ", ".join(f"{value}[{n!r}]" for n in name)
+                g.emit(indent, f"out += {g.const(kind.pack)}({args})")
+            elif isinstance(kind, Optional):
+                kind.emit_pack(g, f"{value}.get({name!r})", indent)  # Optional fields may be left out
+            else:
+                kind.emit_pack(g, f"{value}[{name!r}]", indent)
+
+    def emit_unpack(self, g, indent):
+        items = []
+        for name, kind in self.steps:
+            if isinstance(kind, struct.Struct):
+                names = [g.var() for _ in name]
+                g.emit(indent, f"{', '.join(names)}, = {g.const(kind.unpack_from)}(buf, offset)")
+                g.emit(indent, f"offset += {kind.size}")
+                items.extend(f"{n!r}: {v}" for n, v in zip(name, names))
+            else:
+                items.append(f"{name!r}: {kind.emit_unpack(g, indent)}")
+        v = g.var()
+        g.emit(indent, f"{v} = {{{', '.join(items)}}}")
+        return v
+
+
+U8 = Scalar("B")
+U32 = Scalar("I")
+I32 = Scalar("i")
+BOOL = Bool()
+STR = Str()
+CARD = Card()
+CARDS = CardList()
+
+OTHER_PLAYER = Struct([
+    ('name', STR),
+    ('balance', U32),
+    ('bet', U32),
+    ('folded', BOOL),
+    ('bankrupt', BOOL),
+    ('cards', Optional(CARDS)),
+])
+
+PLAYER_STATE = Struct([
+    ('player_name', STR),
+    ('player_balance', U32),
+    ('player_cards', CARDS),
+    ('community_cards', CARDS),
+    ('other_players', List(OTHER_PLAYER)),
+    ('pot', U32),
+    ('current_bet', U32),
+    ('min_raise', U32),
+    ('player_bet', U32),
+    ('is_turn', BOOL),
+    ('game_stage', Enum(GAME_STAGES)),
+    ('valid_actions', List(Enum(MOVES))),
+    ('action_log', List(STR)),
+    ('log_cursor', U32),
+    ('current_player', Optional(STR)),
+    ('version', U32),
+    ('game_id', Optional(U32)),
+    ('player_id', Optional(U32)),
+])
+
+# Optional on every per-seat request: which of the connection's seats it is for
+SEAT = [('game_id', Optional(U32)), ('player_id', Optional(U32))]
+
+# Message type id -> (name, schema). Requests carry their name in the "action" key.
+MESSAGES = {
+    1: ('hello', Struct([('status', STR), ('player_id', U32), ('game_id', U32)])),
+    2: ('error', Struct([('error', STR)])),
+    3: ('state', PLAYER_STATE),
+    4: ('unchanged', Struct([('unchanged', BOOL), ('version', U32)] + SEAT)),
+    # Action log events first <= seq < cursor, as text (see eventlog.py)
+    5: ('events', Struct([('events', List(STR)), ('first', U32), ('cursor', U32)] + SEAT)),
+    16: ('get_state', Struct([('since', Optional(U32))] + SEAT)),
+    17: ('player_action', Struct([('move', Enum(MOVES)), ('amount', I32)] + SEAT)),
+    18: ('subscribe', Struct(SEAT)),
+    # The first request on a connection is resume (take back that seat) or join (a new seat)
+    19: ('resume', Struct([('game_id', U32), ('player_id', U32)])),
+    # Stakes (big blind) and table size to be seated at; the server's defaults when left out
+    20: ('join', Struct([('stakes', Optional(U32)), ('table_size', Optional(U8))])),
+    21: ('get_events', Struct([('since', U32)] + SEAT)),
+}
+REQUESTS = {'get_state', 'player_action', 'subscribe', 'resume', 'join', 'get_events'}
+MESSAGE_IDS = {name: type_id for type_id, (name, _) in MESSAGES.items()}
+
+
+def message_name(message):
+    """Work out which schema a message dict belongs to."""
+    if 'action' in message:
+        if message['action'] not in REQUESTS:
+            raise ProtocolError(f"Unknown request {message['action']!r}")
+        return message['action']
+    if 'error' in message:
+        return 'error'
+    if 'status' in message:
+        return 'hello'
+    if 'unchanged' in message:
+        return 'unchanged'
+    if 'events' in message:
+        return 'events'
+    return 'state'
+
+
+def encode(message):
+    """Encode a request or response dict into bytes."""
+    name = message_name(message)
+    type_id = MESSAGE_IDS[name]
+    out = bytearray((VERSION, type_id))
+    if name == 'player_action':
+        # Moves arrive in any case ("CALL", "call") and the GUI spells all-in as "allin"
+        message = dict(message, move=message['move'].lower().replace('-', ''), amount=message.get('amount', 0))
+    try:
+        MESSAGES[type_id][1].pack(message, out)
+    except (KeyError, struct.error) as e:
+        raise ProtocolError(f"Cannot encode {name} message: {e}")
+    return bytes(out)
+
+
+def decode(payload):
+    """Decode bytes produced by encode() back into the same dict shape."""
+    if len(payload) < 2:
+        raise ProtocolError("Truncated message")
+    if payload[0] != VERSION:
+        raise ProtocolError(f"Unsupported protocol version {payload[0]}")
+    try:
+        name, schema = MESSAGES[payload[1]]
+    except KeyError:
+        raise ProtocolError(f"Unknown message type {payload[1]}")
+    if not isinstance(payload, bytes):
+        payload = bytes(payload)  # The compiled decoders slice and decode bytes
+    try:
+        message, offset = schema.unpack(payload, 2)
+    except (IndexError, KeyError, struct.error, UnicodeDecodeError) as e:
+        raise ProtocolError(f"Malformed {name} message: {e}")
+    if offset > len(payload):
+        raise ProtocolError(f"Truncated {name} message")
+    if offset != len(payload):
+        raise ProtocolError(f"Trailing bytes after {name} message")
+    if name in REQUESTS:
+        message['action'] = name
+    return message
+
+
+def decode_request(payload):
+    """decode() for servers: anything but a request (a client echoing a reply) is a ProtocolError."""
+    message = decode(payload)
+    if 'action' not in message:
+        raise ProtocolError(f"Expected a request, not the reply type {message_name(message)!r}")
+    return message
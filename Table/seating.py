@@ -0,0 +1,168 @@
+"""Seat allocation for new connections.
+
+    seats = SeatAllocator(table_size=6, stakes=20)
+    game_id, player_id, reused = seats.take()               # default size and stakes
+    game_id, player_id, reused = seats.take(stakes=100, table_size=9)
+    seats.release(game_id, player_id)                       # the seat can be taken again
+    seats.claim(game_id, player_id)                         # a returning player takes it back
+    seats.close_table(game_id)                              # the game is over: no new players
+
+Tables are indexed by (stakes, table size): each kind has a heap of (open seats, game_id)
+so a connection goes to the open table of its kind with the fewest free seats (filling
+tables up so games start), and each table has a heap of its free seat numbers. Taking or
+releasing a seat is O(log n) in the number of tables. Heap entries are not removed when a
+table's count changes; outdated ones are recognised and dropped when they reach the top.
+Seats freed by a disconnect are handed out again, and game ids are never reused, so a new
+connection can never land on a seat someone still holds; claim() lets a reconnecting player
+take back a particular seat, and refuses one that is held; take() says whether the seat
+was given up by an earlier player, whose place in the game a newcomer must not inherit. Seats of tables restored from a
+snapshot start out reserved: only claim() can take them until release_reserved().
+A table is dropped as soon as nobody is seated at it (and no seat is reserved), and a
+closed table is never offered again; table(game_id) is None once a table was dropped.
+
+All methods take the allocator's lock, so the thread-per-connection server, the asyncio
+server and the sharded lobby can share one instance.
+"""
+import heapq
+import threading
+
+MAX_SEATS = 23  # 2 hole cards each plus 5 on the board out of 52
+
+
+class Table:
+    __slots__ = ('game_id', 'size', 'stakes', 'free', 'reserved', 'closed', 'vacated')
+
+    def __init__(self, game_id, size, stakes):
+        self.game_id = game_id
+        self.size = size
+        self.stakes = stakes
+        self.free = list(range(size))  # Heap of free seat numbers, lowest first
+        self.reserved = ()  # Seats kept for players coming back (see add_table)
+        self.closed = False  # No seat is handed out any more (see close_table)
+        self.vacated = set()  # Free seats an earlier player gave up
+
+
+class SeatAllocator:
+    def __init__(self, table_size, stakes):
+        self.table_size = table_size  # Defaults for take()
+        self.stakes = stakes
+        self.tables = {}  # game_id -> Table
+        self.open = {}  # (stakes, size) -> heap of (open seats, game_id)
+        self.next_game_id = 0
+        self.lock = threading.Lock()
+
+    def _index(self, table):
+        if not table.free or table.closed:
+            return
+        kind = (table.stakes, table.size)
+        heap = self.open.setdefault(kind, [])
+        heapq.heappush(heap, (len(table.free), table.game_id))
+        if len(heap) > 2 * len(self.tables) + 64:
+            # Mostly outdated entries: rebuild, which stays O(1) amortized per call
+            heap[:] = [(len(t.free), t.game_id) for t in self.tables.values()
+                       if t.free and not t.closed and (t.stakes, t.size) == kind]
+            heapq.heapify(heap)
+
+    def add_table(self, game_id, size, stakes, reserved=()):
+        """Register an existing table (e.g. restored from a snapshot); reserved seats are
+        only handed out by claim() until release_reserved()."""
+        with self.lock:
+            table = self.tables[game_id] = Table(game_id, size, stakes)
+            table.reserved = set(reserved)
+            table.free = [seat for seat in range(size) if seat not in table.reserved]
+            self.next_game_id = max(self.next_game_id, game_id + 1)
+            self._index(table)
+
+    def take(self, stakes=None, table_size=None):
+        """Seat a new player: returns (game_id, player_id, whether someone sat there before)."""
+        stakes = self.stakes if stakes is None else stakes
+        size = self.table_size if table_size is None else table_size
+        if not 2 <= size <= MAX_SEATS:
+            raise ValueError(f"A table has 2 to {MAX_SEATS} seats")
+        if stakes < 2:
+            raise ValueError("Stakes (the big blind) must be at least 2")
+        with self.lock:
+            heap = self.open.get((stakes, size))
+            while heap:
+                free, game_id = heap[0]
+                table = self.tables.get(game_id)
+                if table is None or table.closed or len(table.free) != free:
+                    heapq.heappop(heap)  # Outdated entry
+                    continue
+                heapq.heappop(heap)
+                seat = heapq.heappop(table.free)
+                self._index(table)
+                if seat in table.vacated:
+                    table.vacated.remove(seat)
+                    return game_id, seat, True
+                return game_id, seat, False
+
+            table = self.tables[self.next_game_id] = Table(self.next_game_id, size, stakes)
+            self.next_game_id += 1
+            seat = heapq.heappop(table.free)
+            self._index(table)
+            return table.game_id, seat, False
+
+    def claim(self, game_id, seat):
+        """Take a particular free seat (a player resuming it); False if it is held, unknown or
+        its table is closed."""
+        with self.lock:
+            table = self.tables.get(game_id)
+            if table is None or table.closed:
+                return False
+            if seat in table.reserved:
+                table.reserved.remove(seat)
+                return True
+            if seat not in table.free:
+                return False
+            table.free.remove(seat)
+            heapq.heapify(table.free)
+            table.vacated.discard(seat)  # Its player is back
+            self._index(table)
+            return True
+
+    def release(self, game_id, seat):
+        with self.lock:
+            table = self.tables.get(game_id)
+            if table is None or seat in table.free:
+                return
+            heapq.heappush(table.free, seat)
+            table.vacated.add(seat)
+            self._index(table)
+            self._drop_if_empty(table)
+
+    def release_reserved(self, game_id):
+        """Make the reserved seats nobody claimed free for anyone; returns how many there were."""
+        with self.lock:
+            table = self.tables.get(game_id)
+            if table is None or not table.reserved:
+                return 0
+            count = len(table.reserved)
+            for seat in table.reserved:
+                heapq.heappush(table.free, seat)
+            table.vacated.update(table.reserved)
+            table.reserved = ()
+            self._index(table)
+            self._drop_if_empty(table)
+            return count
+
+    def close_table(self, game_id):
+        """Stop handing out seats of a table whose game is over; True the first time."""
+        with self.lock:
+            table = self.tables.get(game_id)
+            if table is None or table.closed:
+                return False
+            table.closed = True
+            self._drop_if_empty(table)
+            return True
+
+    def _drop_if_empty(self, table):
+        """Forget a table nobody sits at, unless seats are still kept for players of an open one."""
+        if len(table.free) + len(table.reserved) == table.size and (table.closed or not table.reserved):
+            del self.tables[table.game_id]  # Its entries in the open heaps are outdated from now on
+
+    def table(self, game_id):
+        return self.tables.get(game_id)
+
+    def open_seats(self):
+        return sum(len(table.free) for table in list(self.tables.values()) if not table.closed)
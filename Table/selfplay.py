@@ -0,0 +1,203 @@
+"""Headless self-play: bots play complete hands against each other at machine speed.
+
+    python selfplay.py --tables 64 --hands 1000 --players 6 [--workers 8] [--policy random]
+    python selfplay.py --policy aggressive passive --check --log logs/
+
+Hands are played through the real rules engine (start_new_round -> player_action ->
+next_stage -> get_winner) with one policy callback per seat; no sockets, threads or
+input() are involved. Tables are independent and are split over a process pool, and the
+tool reports hands and actions per second (or JSON with --json). When a game ends because
+only one player has chips left, the table is reset to the starting stacks and play goes on.
+
+--check verifies after every action that no chips were created or lost and no balance went
+negative, and --log writes every table's action log under a directory, so the engine can be
+stress tested with millions of hands; both are off by default.
+"""
+import argparse
+import json
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from poker import PokerGame, Player
+
+MOVES = {
+    'bet': PokerGame.Moves.BET,
+    'call': PokerGame.Moves.CALL,
+    'raise': PokerGame.Moves.RAISE,
+    'fold': PokerGame.Moves.FOLD,
+    'check': PokerGame.Moves.CHECK,
+    'allin': PokerGame.Moves.ALLIN,
+}
+
+
+# A policy is called as policy(game, seat, valid_actions, rng) when it is seat's turn and
+# returns (action name from valid_actions, amount). Policies must be module-level functions
+# so they can be sent to worker processes.
+
+def passive_policy(game, seat, actions, rng):
+    return ('check', 0) if 'check' in actions else ('call', 0)
+
+
+def aggressive_policy(game, seat, actions, rng):
+    stack = game.balances[seat] + game.seat_bets[seat]
+    if 'raise' in actions and game.highest_bet + game.minimum_raise <= stack:
+        return 'raise', game.highest_bet + game.minimum_raise
+    if 'bet' in actions and game.minimum_raise <= stack:
+        return 'bet', game.minimum_raise
+    return passive_policy(game, seat, actions, rng)
+
+
+def random_policy(game, seat, actions, rng):
+    move = rng.choice(actions)
+    stack = game.balances[seat] + game.seat_bets[seat]
+    if move == 'raise':
+        amount = game.highest_bet + game.minimum_raise * rng.randint(1, 3)
+    elif move == 'bet':
+        amount = game.minimum_raise * rng.randint(1, 3)
+    else:
+        return move, 0
+    return (move, amount) if amount <= stack else ('allin', 0)
+
+
+POLICIES = {
+    'passive': passive_policy,
+    'aggressive': aggressive_policy,
+    'random': random_policy,
+}
+
+
+def chips(game):
+    return sum(game.balances) + game.pot
+
+
+def check_table(game, total):
+    if chips(game) != total:
+        raise AssertionError(f"Chip count changed from {total} to {chips(game)}")
+    if min(game.balances) < 0:
+        raise AssertionError(f"Negative balance: {list(game.balances)}")
+
+
+def play_hand(game, policies, rng, check=False, max_actions=10000):
+    """Play the current hand to the end; returns the number of actions taken.
+
+    An action the engine rejects (for example a raise the policy got wrong) is replaced by
+    a check or call so the hand always makes progress.
+    """
+    total = chips(game)
+    hands = game.hands_played
+    actions = 0
+    while game.hands_played == hands:
+        if game.state == PokerGame.GameState.SHOWDOWN:
+            game.get_winner()
+            break
+        seat = game.current_player
+        player = game.players[seat]
+        valid = game.get_valid_actions(player)
+        move, amount = policies[seat](game, seat, valid, rng)
+        if not game.player_action(player, MOVES[move], amount):
+            game.player_action(player, MOVES['check' if 'check' in valid else 'call'])
+        actions += 1
+        if check:
+            check_table(game, total)
+        if actions > max_actions:
+            raise RuntimeError(f"Hand did not finish after {max_actions} actions")
+    if check:
+        check_table(game, total)
+    return actions
+
+
+def game_over(game):
+    """After get_winner: a new round was not started because one player has everything."""
+    return game.state == PokerGame.GameState.SHOWDOWN
+
+
+def new_table(num_players, stack, rng):
+    return PokerGame([Player(f"Player {i+1}", stack) for i in range(num_players)], rng=rng)
+
+
+def run_tables(tables, hands, num_players, policies, seed, stack=1000, check=False, log_path=None):
+    """Play hands on each of tables tables, one after another; returns a stats dict."""
+    rng = random.Random(seed)  # Deals and policy choices, so a run can be replayed
+    seat_policies = [policies[i % len(policies)] for i in range(num_players)]
+    log = open(log_path, "w") if log_path else None
+    stats = {'hands': 0, 'actions': 0, 'games': 0}
+    start = time.perf_counter()
+    try:
+        for table in range(tables):
+            game = new_table(num_players, stack, rng)
+            for _ in range(hands):
+                stats['actions'] += play_hand(game, seat_policies, rng, check)
+                stats['hands'] += 1
+                if log:
+                    log.write(f"--- table {table} hand {game.hands_played}\n")
+                    log.write("\n".join(game.action_log))
+                    log.write("\n")
+                    game.action_log.clear()  # The next hand logs only its own events
+                if game_over(game):
+                    stats['games'] += 1
+                    game = new_table(num_players, stack, rng)
+    finally:
+        if log:
+            log.close()
+    stats['elapsed_s'] = time.perf_counter() - start
+    return stats
+
+
+def simulate(tables, hands, num_players, policies, workers=None, seed=0, stack=1000, check=False,
+             log_dir=None):
+    """Spread the tables over worker processes and combine their stats.
+
+    policies is a list of policy callables assigned to seats in turn. Returns a report with
+    totals and hands/actions per second of wall-clock time.
+    """
+    workers = max(1, min(workers or os.cpu_count() or 1, tables))
+    shares = [tables // workers + (i < tables % workers) for i in range(workers)]
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            pool.submit(run_tables, share, hands, num_players, policies, seed * 1000003 + i, stack, check,
+                        os.path.join(log_dir, f"worker-{i}.log") if log_dir else None)
+            for i, share in enumerate(shares)
+        ]
+        results = [f.result() for f in futures]
+    elapsed = time.perf_counter() - start
+
+    report = {'elapsed_s': elapsed, 'workers': workers, 'tables': tables, 'players': num_players}
+    for key in ('hands', 'actions', 'games'):
+        report[key] = sum(r[key] for r in results)
+    report['hands_per_s'] = report['hands'] / elapsed if elapsed else 0.0
+    report['actions_per_s'] = report['actions'] / elapsed if elapsed else 0.0
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless self-play simulation of PokerGame")
+    parser.add_argument("--tables", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--hands", type=int, default=1000, help="hands played per table")
+    parser.add_argument("--players", type=int, default=6, help="players per table")
+    parser.add_argument("--stack", type=int, default=1000, help="starting balance of every player")
+    parser.add_argument("--policy", nargs="+", choices=sorted(POLICIES), default=["random"],
+                        help="policies assigned to seats in turn")
+    parser.add_argument("--workers", type=int, help="worker processes (default: one per CPU)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--check", action="store_true", help="verify chip invariants after every action")
+    parser.add_argument("--log", metavar="DIR", help="write action logs to DIR/worker-N.log")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args()
+
+    if args.log:
+        os.makedirs(args.log, exist_ok=True)
+    report = simulate(args.tables, args.hands, args.players, [POLICIES[p] for p in args.policy],
+                      args.workers, args.seed, args.stack, args.check, args.log)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(f"{report['hands']} hands ({report['actions']} actions, {report['games']} finished games) "
+              f"on {report['tables']} tables with {report['workers']} workers in {report['elapsed_s']:.1f}s")
+        print(f"Hands/s: {report['hands_per_s']:.0f}  Actions/s: {report['actions_per_s']:.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,107 +1,773 @@
+import argparse
+import asyncio
+import atexit
+import os
+import signal
 import socket
+import sys
+import threading
+import time
 from _thread import start_new_thread
-import pickle
+from collections import deque
+from concurrent.futures import Future
+from actor import TableActor, create_pool
+from framing import FrameError, FrameReader, FrameWriter, read_frame_async, pack_frame, send_frame
+from evaluator import get_evaluator, CACHE_ENV
+from handlog import HandLog, HandRecorder
+from metrics import registry, serve_metrics
+from profiler import SamplingProfiler, SlowRequestTracer, install_toggle
+from seating import SeatAllocator, MAX_SEATS
+from snapshot import Snapshotter, load_tables
 from poker import PokerGame, Player
+from protocol import encode, decode_request, ProtocolError
 
 # Server configuration
 server = "192.168.196.52"
 port = 23345
-
-# Create server socket
-s = socket.socket(socket.AF_INET, socket.SOCK_STREAM) # Create socket with IPv4 and TCP
-try:
-    s.bind((server, port))
-except socket.error as e:
-    print(str(e))
-
-s.listen(2)  # Allow up to 2
-print("Waiting for connections...")
+BACKLOG = 128  # Pending connections the kernel queues before accept()
+FIRST_REQUEST_TIMEOUT = 10  # Seconds a new connection has to send its join or resume
+RESUME_GRACE = 60  # Seconds the seats of restored tables are kept for their players
+PUSH_BACKLOG = 1 << 20  # Bytes of pushed states a client may leave unsent before it is dropped
 
 # Game data
 games = {}  # game_id -> PokerGame
-id_count = 0  # Track total player connections
-MAX_PLAYERS = 2
+actors = {}  # game_id -> TableActor, the only thing allowed to mutate that game
+subscribers = {}  # game_id -> {player_id: push function taking an encoded message}
+subscribers_lock = threading.Lock()
+table_pool = create_pool()  # Worker threads shared by all table actors
+MAX_PLAYERS = 2  # Default table size
+STAKES = 20  # Default big blind
+BUY_IN = 1000  # Chips every player sits down with
+seats = SeatAllocator(MAX_PLAYERS, STAKES)  # Open seats of every table (see seating.py)
+seat_lock = threading.Lock()  # Seats can be taken from several connection threads at once
+allow_join = True  # Whether connections may take extra seats (off in shard.py workers)
+on_release = None  # Called with (game_id, player_id) for every seat given up (shard.py workers tell the lobby)
+on_close = None  # Called with game_id when a table's game is over (likewise)
+hand_log = None  # HandLog every table records its hands to (--hand-log)
+
+# Metrics (see metrics.py), served with --metrics-port
+REQUESTS = registry.counter("poker_requests_total", "Requests received, by action", ("action",))
+REQUEST_SECONDS = registry.histogram("poker_request_seconds",
+                                     "Time from decoded request to reply ready, by action", ("action",))
+DECODE_SECONDS = registry.histogram("poker_decode_seconds", "Time to decode a request")
+ENCODE_SECONDS = registry.histogram("poker_encode_seconds", "Time to encode a reply")
+ERRORS = registry.counter("poker_errors_total", "Errors, by kind", ("kind",))
+CONNECTIONS = registry.gauge("poker_connections", "Open client connections")
+SEATS = registry.gauge("poker_seats", "Seats held by connected clients")
+registry.gauge("poker_tables", "Live tables", func=lambda: len(games))
+tracer = None  # SlowRequestTracer when --slow-ms is given
 
 def cleanup_game(game_id):
-    if game_id in games:
-        del games[game_id]
+    """Forget a table the seat allocator dropped: nobody sits at it any more."""
+    games.pop(game_id, None)
+    actors.pop(game_id, None)
+    with subscribers_lock:
+        subscribers.pop(game_id, None)
 
 
-def threaded_client(conn, player_id, game_id):
-    global id_count
+def next_seat(stakes=None, table_size=None):
+    """Pick the player_id/game_id for a new connection: an open seat at the fullest table
+    with these stakes and size (the defaults when None), or a seat at a new table. The
+    third value says whether an earlier player gave the seat up (see occupy_seat)."""
+    game_id, player_id, reused = seats.take(stakes, table_size)
+    return player_id, game_id, reused
 
-    try:
-        conn.sendall(pickle.dumps({"status": "ok", "player_id": player_id}))
 
+def table_history(game_id):
+    return HandRecorder(hand_log, game_id) if hand_log else None
+
+
+def add_game(game_id, game):
+    games[game_id] = game
+    actors[game_id] = TableActor(game, table_pool,
+                                 on_change=lambda snapshot, g=game_id: table_changed(g, game, snapshot),
+                                 table_id=game_id)
+
+
+def table_changed(game_id, game, snapshot):
+    """Runs on the table's actor after every change: push the new states, and stop seating
+    players at the table once its game is over."""
+    publish(game_id, snapshot)
+    if game.game_over and seats.close_table(game_id):
+        print(f"Game {game_id} is over")
+        if on_close:
+            on_close(game_id)
+        if seats.table(game_id) is None:
+            cleanup_game(game_id)
+
+
+def ensure_game(game_id, table_size=None, stakes=None):
+    """Create the game (and its actor) if this is the first player; True if it was created.
+
+    The table's size and stakes come from the seat allocator when it handed out the seat,
+    else from the arguments or the allocator's defaults.
+    """
+    if game_id not in games:
+        table = seats.table(game_id)
+        if table is not None:
+            table_size, stakes = table.size, table.stakes
+        players = [Player(f"Player {i+1}", BUY_IN) for i in range(table_size or seats.table_size)]
+        add_game(game_id, PokerGame(players, history=table_history(game_id), big_blind=stakes or seats.stakes))
+        print(f"Creating new game {game_id}...")
+        return True
+    print(f"Joining game {game_id}...")
+    return False
+
+
+def seat_newcomer(game, player_id):
+    """Table actor command: hand a seat someone gave up to a new player with a fresh buy-in."""
+    settled = game.state == game.GameState.SHOWDOWN
+    game.replace_player(player_id, Player(f"Player {player_id + 1}", BUY_IN))
+    if not settled and game.state == game.GameState.SHOWDOWN:
+        game.get_winner()  # The previous occupant's fold ended the hand
+
+
+def ready_now():
+    ready = Future()
+    ready.set_result(None)
+    return ready
+
+
+def occupy_seat(game_id, player_id, reused=False):
+    """Create the game if needed and give the seat to its new occupant.
+
+    Returns a Future that is done once the seat is ready: a seat an earlier player gave up
+    first gets a fresh Player from the table's actor, so nothing of whoever sat there
+    before (stack, cards, bankrupt flag) passes to the newcomer.
+    """
+    with seat_lock:
+        created = ensure_game(game_id)
+    if created or not reused:
+        return ready_now()
+    return actors[game_id].submit(seat_newcomer, player_id)
+
+
+def restore_tables(path, grace=RESUME_GRACE):
+    """Load the tables saved in a snapshot file.
+
+    Their seats are kept for the players who held them, who get them back with a resume
+    request; seats nobody resumed within grace seconds are handed to new connections.
+    """
+    restored = load_tables(path, table_history)
+    with seat_lock:
+        for game_id, game in restored.items():
+            add_game(game_id, game)
+            size = len(game.players)
+            seats.add_table(game_id, size, game.big_blind, reserved=range(size))
+    print(f"Restored {len(restored)} tables from {path}")
+    if restored:
+        timer = threading.Timer(grace, release_unclaimed, (list(restored),))
+        timer.daemon = True
+        timer.start()
+
+
+def release_unclaimed(game_ids):
+    released = sum(seats.release_reserved(game_id) for game_id in game_ids)
+    print(f"Released {released} restored seats nobody resumed")
+    for game_id in game_ids:
+        if seats.table(game_id) is None:
+            cleanup_game(game_id)  # Nobody came back to it
+
+
+def assign_seat(stakes=None, table_size=None):
+    """Seat a new player: returns (player_id, game_id, a Future done once the seat is ready)."""
+    player_id, game_id, reused = next_seat(stakes, table_size)
+    return player_id, game_id, occupy_seat(game_id, player_id, reused)
+
+
+def release_seat(player_id, game_id):
+    print(f"Player {player_id} disconnected.")
+    unsubscribe(player_id, game_id)
+    seats.release(game_id, player_id)  # The next connection may take it over
+    if seats.table(game_id) is None:
+        cleanup_game(game_id)  # That was the last player at the table
+    if on_release:
+        on_release(game_id, player_id)
+
+
+def seat_connection(data):
+    """Seat a new connection from its first request and return (player_id, game_id, ready),
+    ready being a Future done once the seat can be played (see occupy_seat).
+
+    {"action": "join"} (optionally with stakes/table_size) takes a new seat and
+    {"action": "resume", "game_id": g, "player_id": p} takes back a seat nobody holds.
+    Raises ValueError if the request cannot be given a seat.
+    """
+    action = data.get("action")
+    if action == "resume":
+        game_id, player_id = data["game_id"], data["player_id"]
+        if game_id not in actors or not seats.claim(game_id, player_id):
+            raise ValueError(f"Seat {player_id} of game {game_id} cannot be resumed")
+        print(f"Resuming player {player_id} in game {game_id}...")
+        return player_id, game_id, ready_now()
+    if action == "join":
+        return assign_seat(data.get("stakes"), data.get("table_size"))
+    raise ValueError("The first request on a connection must be join or resume")
+
+
+def subscribe(player_id, game_id, push):
+    """Register a connection to receive its seat's state every time the game changes."""
+    with subscribers_lock:
+        subscribers.setdefault(game_id, {})[player_id] = push
+
+
+def unsubscribe(player_id, game_id):
+    with subscribers_lock:
+        table = subscribers.get(game_id)
+        if table:
+            table.pop(player_id, None)
+            if not table:
+                del subscribers[game_id]
+
+
+def publish(game_id, snapshot):
+    """Push the per-player states of a table snapshot to every subscribed seat."""
+    with subscribers_lock:
+        pushes = list(subscribers.get(game_id, {}).items())
+    for player_id, push in pushes:
+        try:
+            push(snapshot.payload(player_id))
+        except Exception as e:
+            print(f"Dropping push subscription of player {player_id}: {e}")
+            unsubscribe(player_id, game_id)
+
+
+def apply_player_action(game, player_id, move, amount):
+    """Table actor command: play one move for player_id if it is their turn.
+
+    Returns None once the move changed the game, else why nothing happened.
+    """
+    if game.current_player != player_id:
+        return "Not your turn"
+    version = game.version
+    player = game.players[player_id]
+
+    # Process the action
+    action_successful = game.player_action(player, game.Moves[move.upper()], amount)
+
+    # Check if we should move to next stage
+    if action_successful and game.is_betting_round_complete():
+        game.next_stage()
+
+    # Check for showdown
+    if game.state == game.GameState.SHOWDOWN:
+        winner = game.get_winner()
+        # Game will automatically start new round if possible
+
+    return "Move not allowed" if game.version == version else None
+
+
+def dispatch(data, player_id, game_id):
+    """Answer one client request for the seat player_id/game_id.
+
+    Reads are served from the table's latest snapshot, as the seat's already encoded state
+    (bytes). Moves are queued on the table's actor, in which case a Future is returned;
+    once it resolves the reply is the seat's state from the new snapshot (see
+    action_response).
+    """
+    actor = actors.get(game_id)
+    if actor is None:
+        return {"error": "Game not found"}
+
+    snapshot = actor.snapshot
+
+    if data["action"] == "get_state":
+        # Clients send the version of their last snapshot; skip sending it if nothing changed
+        if data.get("since") == snapshot.version:
+            return {"unchanged": True, "version": snapshot.version, "game_id": game_id, "player_id": player_id}
+        return snapshot.payload(player_id)
+
+    elif data["action"] == "subscribe":
+        return snapshot.payload(player_id)
+
+    elif data["action"] == "get_events":
+        # The action log is safe to read next to the actor; stop at what this snapshot has seen
+        until = snapshot.states[player_id]['log_cursor']
+        events = actor.game.action_log.since(data["since"], until)
+        return {"events": [event.text for event in events], "first": events[0].seq if events else until,
+                "cursor": until, "game_id": game_id, "player_id": player_id}
+
+    elif data["action"] == "player_action":
+        return actor.submit(apply_player_action, player_id, data["move"], data.get("amount", 0))
+
+    return {"error": "Invalid request"}
+
+
+def action_response(player_id, game_id):
+    return actors[game_id].snapshot.payload(player_id)
+
+
+def reply_payload(response):
+    """Encode a reply dict; seat states come from dispatch already encoded."""
+    return response if isinstance(response, bytes) else encode(response)
+
+
+class RequestTimer:
+    """perf_counter_ns() timestamps around one request, for metrics and slow-request traces."""
+    __slots__ = ('action', 'start', 'decoded', 'handled', 'encoded')
+
+    def __init__(self):
+        self.action = None
+        self.start = time.perf_counter_ns()
+
+
+def read_request(payload, timer):
+    data = decode_request(payload)
+    timer.action = data["action"]
+    timer.decoded = time.perf_counter_ns()
+    DECODE_SECONDS.observe_ns(timer.decoded - timer.start)
+    REQUESTS.labels(timer.action).inc()
+    return data
+
+
+def finish_request(timer, response):
+    """Record how long the request took and encode its reply (None if nothing is sent)."""
+    timer.handled = time.perf_counter_ns()
+    REQUEST_SECONDS.labels(timer.action).observe_ns(timer.handled - timer.decoded)
+    if response is None:
+        timer.encoded = timer.handled
+        return None
+    payload = reply_payload(response)
+    timer.encoded = time.perf_counter_ns()
+    ENCODE_SECONDS.observe_ns(timer.encoded - timer.handled)
+    return payload
+
+
+def trace_requests(timers):
+    """Called once the replies to timers' requests were sent."""
+    if tracer and timers:
+        sent = time.perf_counter_ns()
+        for timer in timers:
+            tracer.record(timer, sent)
+
+
+class Session:
+    """The seats held by one client connection.
+
+    A connection starts with the seat its first request (join or resume) was given and can
+    take more with {"action": "join"}. Requests name their seat with game_id/player_id; requests without
+    them act on the first seat, so single-table clients need not send them.
+    """
+
+    def __init__(self, push, player_id, game_id):
+        self.push = push  # Thread-safe function sending one encoded message to this client
+        self.primary = (game_id, player_id)
+        self.seats = [self.primary]
+        self.subscribed = set()
+        SEATS.inc()
+
+    def hello(self):
+        game_id, player_id = self.primary
+        return {"status": "ok", "player_id": player_id, "game_id": game_id}
+
+    def seat_for(self, data):
+        if data.get("game_id") is None or data.get("player_id") is None:
+            return self.primary
+        return data["game_id"], data["player_id"]
+
+    def request(self, data):
+        """Handle one decoded request.
+
+        Returns the reply (a dict, or bytes for an already encoded seat state), None when
+        nothing should be sent back, or a Future that resolves to one of those once the
+        table actor has applied a move (or seated a join).
+        """
+        action = data["action"]
+
+        if action == "resume":
+            return {"error": "resume must be the first request on a connection"}
+
+        if action == "join":
+            if not allow_join:
+                return {"error": "This server does not support joining more tables on one connection"}
+            try:
+                player_id, game_id, ready = assign_seat(data.get("stakes"), data.get("table_size"))
+            except ValueError as e:
+                return {"error": str(e)}
+            self.seats.append((game_id, player_id))
+            SEATS.inc()
+            reply = Future()
+            ready.add_done_callback(lambda _: reply.set_result(
+                {"status": "ok", "player_id": player_id, "game_id": game_id}))
+            return reply
+
+        seat = self.seat_for(data)
+        if seat not in self.seats:
+            return {"error": "Not seated at that table"}
+        game_id, player_id = seat
+
+        if action == "subscribe":
+            # Register before reading the snapshot, so a change published in between is pushed
+            subscribe(player_id, game_id, self.push)
+            response = dispatch(data, player_id, game_id)
+            if isinstance(response, bytes):
+                self.subscribed.add(seat)
+            else:
+                unsubscribe(player_id, game_id)
+            return response
+
+        response = dispatch(data, player_id, game_id)
+
+        if isinstance(response, Future):
+            reply = Future()
+
+            def done(applied):
+                if applied.exception() is not None:
+                    reply.set_exception(applied.exception())
+                elif seat in self.subscribed and applied.result() is None:
+                    reply.set_result(None)  # The table actor already pushed the new state to us
+                elif seat in self.subscribed:
+                    reply.set_result({"error": applied.result()})  # Nothing changed, so nothing was pushed
+                else:
+                    reply.set_result(action_response(player_id, game_id))
+
+            response.add_done_callback(done)
+            return reply
+
+        return response
+
+    def close(self):
+        SEATS.dec(len(self.seats))
+        for game_id, player_id in self.seats:
+            release_seat(player_id, game_id)
+
+
+class Outbox:
+    """Pushed states waiting to go out on one threaded connection.
+
+    Table actors only queue the frame; a writer thread of the connection's own (started on
+    the first push) does the blocking send, so a client that stops reading never holds up
+    the table workers. A client that lets more than PUSH_BACKLOG bytes pile up is cut off.
+    """
+
+    def __init__(self, conn, send_lock, limit=PUSH_BACKLOG):
+        self.conn = conn
+        self.send_lock = send_lock  # Also taken by the connection thread to send its replies
+        self.limit = limit
+        self.frames = deque()
+        self.queued = 0  # Bytes queued or being sent
+        self.ready = threading.Condition()
+        self.thread = None
+        self.closed = False
+
+    def push(self, payload):
+        frame = pack_frame(payload)
+        with self.ready:
+            if self.closed:
+                raise ConnectionError("Connection closed")
+            if self.queued + len(frame) > self.limit:
+                self._abort()
+                raise ConnectionError(f"Client left {self.queued} bytes of updates unread")
+            self.frames.append(frame)
+            self.queued += len(frame)
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, name="push", daemon=True)
+                self.thread.start()
+            self.ready.notify()
+
+    def _run(self):
         while True:
+            with self.ready:
+                while not self.frames and not self.closed:
+                    self.ready.wait()
+                if self.closed:
+                    return
+                batch = b"".join(self.frames)
+                self.frames.clear()
             try:
-                data = pickle.loads(conn.recv(4096))
-                if not data:
-                    print(f"Player {player_id} disconnected.")
-                    break
+                with self.send_lock:
+                    self.conn.sendall(batch)
+            except OSError:
+                with self.ready:
+                    self._abort()
+                return
+            with self.ready:
+                self.queued -= len(batch)
 
-                if game_id in games:
-                    game = games[game_id]
+    def _abort(self):
+        # Called with self.ready held
+        self.closed = True
+        self.frames.clear()
+        self.ready.notify()
+        try:
+            self.conn.shutdown(socket.SHUT_RDWR)  # Also ends the connection thread's recv()
+        except OSError:
+            pass
 
-                    if data["action"] == "get_state":
-                        player_state = game.get_player_state(player_id)
-                        conn.sendall(pickle.dumps(player_state))
+    def close(self):
+        with self.ready:
+            self.closed = True
+            self.ready.notify()
 
-                    elif data["action"] == "player_action":
-                        if game.current_player == player_id:
-                            player = game.players[player_id]
-                            action = data["move"]
-                            amount = data.get("amount", 0)
 
-                            # Process the action
-                            action_successful = game.player_action(player, game.Moves[action.upper()], amount)
+def threaded_client(conn):
+    reader = FrameReader(conn)
+    try:
+        conn.settimeout(FIRST_REQUEST_TIMEOUT)
+        payload = reader.read_frame()
+        conn.settimeout(None)
+        if payload is None:
+            conn.close()
+            return
+        player_id, game_id, ready = seat_connection(decode_request(payload))
+        ready.result()
+    except (ValueError, ProtocolError, FrameError) as e:
+        try:
+            send_frame(conn, encode({"error": str(e)}))
+        except OSError:
+            pass
+        conn.close()
+        return
+    except OSError:
+        conn.close()  # Timed out or disconnected before asking for a seat
+        return
+    serve_threaded(conn, reader, player_id, game_id)
 
-                            # Check if we should move to next stage
-                            if action_successful and game.is_betting_round_complete():
-                                game.next_stage()
 
-                            # Check for showdown
-                            if game.state == game.GameState.SHOWDOWN:
-                                winner = game.get_winner()
-                                # Game will automatically start new round if possible
+def serve_threaded(conn, reader, player_id, game_id):
+    send_lock = threading.Lock()  # Replies and the outbox's pushes share this socket
+    outbox = Outbox(conn, send_lock)
+    session = Session(outbox.push, player_id, game_id)
+    CONNECTIONS.inc()
 
-                        # Send updated state
-                        player_state = game.get_player_state(player_id)
-                        conn.sendall(pickle.dumps(player_state))
+    try:
+        with send_lock:
+            send_frame(conn, encode(session.hello()))
+        writer = FrameWriter(conn)
 
-                    else:
-                        conn.sendall(pickle.dumps({"error": "Invalid request"}))
-                else:
-                    conn.sendall(pickle.dumps({"error": "Game not found"}))
+        while True:
+            try:
+                # Every request that arrived in the same recv() is answered with one sendall()
+                frames = reader.read_frames()
+                if not frames:
+                    print(f"Player {player_id} disconnected.")
+                    break
+
+                timers = []
+                for payload in frames:
+                    timer = RequestTimer()
+                    try:
+                        data = read_request(payload, timer)
+                    except ProtocolError as e:
+                        ERRORS.labels("bad_request").inc()
+                        writer.write(encode({"error": f"Bad request: {e}"}))
+                        continue
+
+                    response = session.request(data)
+                    if isinstance(response, Future):
+                        response = response.result()
+                    response = finish_request(timer, response)
+                    if response is not None:
+                        writer.write(response)
+                    timers.append(timer)
+                with send_lock:
+                    writer.flush()
+                trace_requests(timers)
 
             except Exception as e:
+                ERRORS.labels("connection").inc()
                 print(f"Error with player {player_id}: {e}")
                 break
 
     except Exception as e:
+        ERRORS.labels("connection").inc()
         print(f"Thread error: {e}")
 
-    print(f"Player {player_id} disconnected.")
-    id_count -= 1
+    session.close()
+    outbox.close()
     conn.close()
+    CONNECTIONS.dec()
 
 
-while True:
-    # Accept new connections
-    conn, addr = s.accept()
-    print("Connected to:", addr)
+def run_threaded_server(backlog=BACKLOG):
+    """Original mode: one OS thread per connected player."""
+    # Create server socket
+    s = socket.socket(socket.AF_INET, socket.SOCK_STREAM) # Create socket with IPv4 and TCP
+    try:
+        s.bind((server, port))
+    except socket.error as e:
+        print(str(e))
 
-    id_count += 1
-    player_id = (id_count - 1) % MAX_PLAYERS  # Cycle through player IDs
-    game_id = (id_count - 1) // MAX_PLAYERS  # Determine game ID based on player count
+    s.listen(backlog)
+    print("Waiting for connections...")
+
+    while True:
+        # Accept new connections
+        conn, addr = s.accept()
+        print("Connected to:", addr)
+
+        # Start client thread; it seats the connection once its first request arrives
+        start_new_thread(threaded_client, (conn,))
+
+
+async def async_client(reader, writer):
+    """Serve one connection on the event loop (same protocol as threaded_client)."""
+    print("Connected to:", writer.get_extra_info("peername"))
+    try:
+        payload = await asyncio.wait_for(read_frame_async(reader), FIRST_REQUEST_TIMEOUT)
+        if payload is None:
+            writer.close()
+            return
+        player_id, game_id, ready = seat_connection(decode_request(payload))
+        await asyncio.wrap_future(ready)
+    except (ValueError, ProtocolError, FrameError) as e:
+        writer.write(pack_frame(encode({"error": str(e)})))
+        writer.close()
+        return
+    except (asyncio.TimeoutError, ConnectionError, asyncio.IncompleteReadError):
+        writer.close()  # Timed out or disconnected before asking for a seat
+        return
+    await serve_seat(reader, writer, player_id, game_id)
+
+
+async def serve_seat(reader, writer, player_id, game_id):
+    """Run the request loop for a connection already seated at player_id/game_id."""
+    loop = asyncio.get_running_loop()
+
+    def push(payload):
+        # Called from table actor threads, so hand the write over to the event loop; a
+        # client leaving more than PUSH_BACKLOG bytes unread is cut off instead of buffered
+        if writer.transport.get_write_buffer_size() > PUSH_BACKLOG:
+            loop.call_soon_threadsafe(writer.transport.abort)
+            raise ConnectionError("Client is not reading its updates")
+        loop.call_soon_threadsafe(writer.write, pack_frame(payload))
+
+    session = Session(push, player_id, game_id)
+    CONNECTIONS.inc()
+
+    try:
+        writer.write(pack_frame(encode(session.hello())))
+        await writer.drain()
+
+        while True:
+            try:
+                payload = await read_frame_async(reader)
+                if payload is None:
+                    break
+                timer = RequestTimer()
+                try:
+                    data = read_request(payload, timer)
+                except ProtocolError as e:
+                    ERRORS.labels("bad_request").inc()
+                    writer.write(pack_frame(encode({"error": f"Bad request: {e}"})))
+                    continue
+
+                response = session.request(data)
+                if isinstance(response, Future):
+                    # Wait for the table actor without blocking the event loop
+                    response = await asyncio.wrap_future(response)
+                response = finish_request(timer, response)
+                if response is not None:
+                    writer.write(pack_frame(response))
+                await writer.drain()
+                trace_requests((timer,))
+
+            except (ConnectionError, asyncio.IncompleteReadError):
+                break
+            except Exception as e:
+                ERRORS.labels("connection").inc()
+                print(f"Error with player {player_id}: {e}")
+                break
+
+    finally:
+        session.close()
+        writer.close()
+        CONNECTIONS.dec()
+
+
+async def serve_async(backlog=BACKLOG):
+    """Serve every connection from a single asyncio event loop."""
+    srv = await asyncio.start_server(async_client, server, port, backlog=backlog, reuse_address=True)
+    print("Waiting for connections...")
+    async with srv:
+        await srv.serve_forever()
+
+
+def run_async_server(backlog=BACKLOG):
+    asyncio.run(serve_async(backlog))
+
+
+def open_hand_log(path, fsync_interval):
+    global hand_log
+    hand_log = HandLog(path, fsync_interval)
+    atexit.register(hand_log.close)  # The writer is a daemon thread: commit what is queued on exit
+    print(f"Recording hand history to {path}")
+
+
+def start_profiling(args):
+    global tracer
+    profiler = SamplingProfiler(args.profile_out)
+    if install_toggle(profiler):
+        print(f"Send SIGUSR1 to pid {os.getpid()} to start/stop the profiler")
+    atexit.register(profiler.stop)  # Write what was sampled if the server exits while profiling
+    if args.profile:
+        profiler.start()
+    if args.slow_ms is not None:
+        tracer = SlowRequestTracer(args.slow_out, args.slow_ms)
+
+
+def main():
+    global server, port
+
+    parser = argparse.ArgumentParser(description="Texas Hold'em poker server")
+    parser.add_argument("--mode", choices=["thread", "async"], default="thread",
+                        help="thread: one thread per connection, async: single event loop")
+    parser.add_argument("--host", default=server)
+    parser.add_argument("--port", type=int, default=port)
+    parser.add_argument("--backlog", type=int, default=BACKLOG,
+                        help="listen() accept backlog")
+    parser.add_argument("--lookup-cache", metavar="PATH",
+                        help=f"hand evaluator table cache file (default: ${CACHE_ENV})")
+    parser.add_argument("--table-size", type=int, default=MAX_PLAYERS,
+                        help="seats at tables created for connections that do not ask for a size")
+    parser.add_argument("--stakes", type=int, default=STAKES,
+                        help="big blind of tables created for connections that do not ask for stakes")
+    parser.add_argument("--hand-log", metavar="PATH", help="append every hand to this hand history file")
+    parser.add_argument("--fsync-interval", type=float, default=0.05,
+                        help="seconds between group commits of the hand history")
+    parser.add_argument("--snapshot", metavar="PATH",
+                        help="restore tables from this file on start and save them to it periodically")
+    parser.add_argument("--snapshot-interval", type=float, default=30, help="seconds between table snapshots")
+    parser.add_argument("--resume-grace", type=float, default=RESUME_GRACE,
+                        help="seconds restored seats are kept for their players before new ones may take them")
+    parser.add_argument("--metrics-port", type=int,
+                        help="serve Prometheus metrics on http://127.0.0.1:PORT/metrics")
+    parser.add_argument("--profile", action="store_true",
+                        help="start the sampling profiler right away (SIGUSR1 toggles it)")
+    parser.add_argument("--profile-out", metavar="PATH", default="server.folded",
+                        help="collapsed stacks file the profiler writes when stopped")
+    parser.add_argument("--slow-ms", type=float, help="trace requests slower than this many milliseconds")
+    parser.add_argument("--slow-out", metavar="PATH", default="slow.folded",
+                        help="collapsed stacks file slow-request traces are appended to")
+    args = parser.parse_args()
+
+    server, port = args.host, args.port
+    if not 2 <= args.table_size <= MAX_SEATS or args.stakes < 2:
+        parser.error(f"--table-size must be 2 to {MAX_SEATS} and --stakes at least 2")
+    seats.table_size, seats.stakes = args.table_size, args.stakes
+    get_evaluator(args.lookup_cache)  # Build the hand evaluator before the first showdown
+    if args.hand_log:
+        open_hand_log(args.hand_log, args.fsync_interval)
+    snapshotter = None
+    if args.snapshot:
+        if os.path.exists(args.snapshot):
+            restore_tables(args.snapshot, args.resume_grace)
+        snapshotter = Snapshotter(args.snapshot, actors, args.snapshot_interval)
+    if args.metrics_port:
+        serve_metrics(args.metrics_port)
+    start_profiling(args)
+
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))  # Shut down as cleanly as on Ctrl-C
+    try:
+        if args.mode == "async":
+            run_async_server(args.backlog)
+        else:
+            run_threaded_server(args.backlog)
+    finally:
+        if snapshotter:
+            # Save the final state now: atexit runs after the table workers have shut down
+            snapshotter.stop()
 
-    # Create a new game if this is the first player
-    if game_id not in games:
-        players = [Player(f"Player {i+1}", 1000) for i in range(MAX_PLAYERS)]
-        games[game_id] = PokerGame(players)
-        print(f"Creating new game {game_id}...")
-    else:
-        print(f"Joining game {game_id}...")
 
-    # Start client thread
-    start_new_thread(threaded_client, (conn, player_id, game_id))
+if __name__ == "__main__":
+    main()
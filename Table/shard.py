@@ -0,0 +1,262 @@
+"""Multi-process server: a lobby process accepts every connection and hands the socket
+to the worker process that owns the connection's game.
+
+    python shard.py --workers 4 [--host H] [--port P] [--backlog N]
+
+Each worker runs the asyncio server loop from server.py for its own share of the games,
+so table logic is spread over all cores instead of sharing one GIL. Sockets are passed
+between processes with SCM_RIGHTS (socket.send_fds), which needs Python 3.9+ on Linux or
+another Unix.
+
+Every client starts by sending one request: {"action": "join"} for a new seat, or
+{"action": "resume", "game_id": g, "player_id": p} to take back the seat it lost (see
+Network.reconnect). The lobby seats it from its own SeatAllocator, then passes the socket
+on together with the table's size and stakes, which the worker builds the game with; the
+worker then greets the client with the usual hello. Routing is sticky: a game stays on the
+worker it was first assigned to. Workers report every seat given up back to the lobby, so
+a seat can be resumed (or handed to a new player) only while nobody holds it, and every
+game that ends, so its table gets no new players; a table is dropped once it is empty.
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import socket
+import struct
+
+import server
+from evaluator import get_evaluator, CACHE_ENV
+from framing import FrameError, FrameReader, pack_frame
+from protocol import encode, decode_request, ProtocolError
+
+HANDOFF = struct.Struct("!IIII?")  # game_id, player_id, table size, stakes, reused: with each passed socket
+REPORT = struct.Struct("!BII")  # kind, game_id, player_id: what a worker tells the lobby
+SEAT_RELEASED, GAME_OVER = 1, 2
+
+
+class Lobby:
+    def __init__(self, workers, hand_log=None):
+        self.workers = workers
+        self.hand_log = hand_log  # (path, fsync interval); each worker writes path.<index>
+        self.channels = []  # Lobby end of each worker's handoff socket
+        self.processes = []
+        self.owners = {}  # game_id -> index of the worker running it
+        self.load = [0] * workers  # Games assigned to each worker
+        self.tasks = set()
+
+    def start_workers(self):
+        ctx = multiprocessing.get_context("fork")
+        for index in range(self.workers):
+            lobby_end, worker_end = socket.socketpair(socket.AF_UNIX, socket.SOCK_SEQPACKET)
+            process = ctx.Process(target=worker_main, args=(index, worker_end, self.hand_log), daemon=True)
+            process.start()
+            worker_end.close()
+            self.channels.append(lobby_end)
+            self.processes.append(process)
+
+    def route(self, game_id):
+        """Worker for a game: its current owner, or the least loaded worker for a new game."""
+        worker = self.owners.get(game_id)
+        if worker is None:
+            worker = min(range(self.workers), key=self.load.__getitem__)
+            self.owners[game_id] = worker
+            self.load[worker] += 1
+        return worker
+
+    async def read_first(self, loop, conn):
+        """The client's first frame, or None if it sends none within FIRST_REQUEST_TIMEOUT.
+
+        Clients wait for their hello before sending anything else, so nothing after the
+        first frame is read here and lost with the lobby's copy of the socket.
+        """
+        reader = FrameReader()
+        deadline = loop.time() + server.FIRST_REQUEST_TIMEOUT
+        try:
+            while True:
+                data = await asyncio.wait_for(loop.sock_recv(conn, 4096), deadline - loop.time())
+                if not data:
+                    return None
+                frames = reader.feed(data)
+                if frames:
+                    return frames[0]
+        except (asyncio.TimeoutError, FrameError, OSError):
+            return None
+
+    def drop(self, game_id):
+        """Forget the owner of a table the allocator dropped."""
+        worker = self.owners.pop(game_id, None)
+        if worker is not None:
+            self.load[worker] -= 1
+
+    def seat(self, message):
+        """(player_id, game_id, whether an earlier player gave the seat up) for a first
+        request; raises ValueError if it gets no seat."""
+        action = message.get("action")
+        if action == "resume":
+            game_id, player_id = message["game_id"], message["player_id"]
+            if game_id not in self.owners or not server.seats.claim(game_id, player_id):
+                raise ValueError(f"Seat {player_id} of game {game_id} cannot be resumed")
+            print(f"Resuming player {player_id} in game {game_id}...")
+            return player_id, game_id, False
+        if action == "join":
+            return server.next_seat(message.get("stakes"), message.get("table_size"))
+        raise ValueError("The first request on a connection must be join or resume")
+
+    def on_report(self, channel):
+        """Apply what the worker on channel reports: seats given up and games over."""
+        while True:
+            try:
+                data = channel.recv(REPORT.size)
+            except BlockingIOError:
+                return
+            if not data:
+                asyncio.get_running_loop().remove_reader(channel.fileno())  # The worker exited
+                return
+            kind, game_id, player_id = REPORT.unpack(data)
+            if kind == SEAT_RELEASED:
+                server.seats.release(game_id, player_id)
+            elif kind == GAME_OVER:
+                server.seats.close_table(game_id)
+            if server.seats.table(game_id) is None:
+                self.drop(game_id)
+
+    async def handle(self, loop, conn):
+        try:
+            payload = await self.read_first(loop, conn)
+            if payload is None:
+                return
+            try:
+                player_id, game_id, reused = self.seat(decode_request(payload))
+            except (ValueError, ProtocolError) as e:
+                await loop.sock_sendall(conn, pack_frame(encode({"error": str(e)})))
+                return
+
+            # The worker builds the table from the handoff, as only the lobby's allocator knows its kind
+            table = server.seats.table(game_id)
+            worker = self.route(game_id)
+            handoff = HANDOFF.pack(game_id, player_id, table.size, table.stakes, reused)
+            socket.send_fds(self.channels[worker], [handoff], [conn.fileno()])
+        except Exception as e:
+            print(f"Handoff failed: {e}")
+        finally:
+            conn.close()  # The worker holds its own copy of the socket now
+
+    async def serve(self, host, port, backlog):
+        listener = socket.create_server((host, port), backlog=backlog)
+        listener.setblocking(False)
+        loop = asyncio.get_running_loop()
+        for channel in self.channels:
+            channel.setblocking(False)
+            loop.add_reader(channel.fileno(), self.on_report, channel)
+        print(f"Lobby waiting for connections with {self.workers} workers...")
+
+        while True:
+            conn, addr = await loop.sock_accept(listener)
+            print("Connected to:", addr)
+            task = loop.create_task(self.handle(loop, conn))
+            self.tasks.add(task)
+            task.add_done_callback(self.tasks.discard)
+
+
+def worker_main(index, channel, hand_log=None):
+    if hand_log:
+        path, fsync_interval = hand_log
+        server.open_hand_log(f"{path}.{index}", fsync_interval)  # The writer thread must start after fork
+    try:
+        asyncio.run(run_worker(index, channel))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if server.hand_log:
+            server.hand_log.close()  # Worker processes exit without running atexit handlers
+
+
+async def run_worker(index, channel):
+    """Serve every socket the lobby passes to this worker."""
+    loop = asyncio.get_running_loop()
+    lobby_closed = loop.create_future()
+    # Seats are numbered by the lobby, so a worker cannot hand out extra ones itself
+    server.allow_join = False
+    tasks = set()
+    channel.setblocking(False)
+
+    def report(kind, game_id, player_id=0):
+        try:
+            channel.send(REPORT.pack(kind, game_id, player_id))
+        except OSError as e:
+            print(f"Could not report game {game_id} to the lobby: {e}")
+
+    server.on_release = lambda game_id, player_id: report(SEAT_RELEASED, game_id, player_id)
+    server.on_close = lambda game_id: report(GAME_OVER, game_id)
+
+    async def start_seat(game_id, player_id, table_size, stakes, reused, fd):
+        conn = socket.socket(fileno=fd)
+        reader, writer = await asyncio.open_connection(sock=conn)
+        # The worker's own allocator tracks the seats of its tables, to drop them once empty
+        if server.seats.table(game_id) is None:
+            server.seats.add_table(game_id, table_size, stakes)
+        if not server.seats.claim(game_id, player_id):
+            # The game ended here before the lobby heard of it
+            writer.write(pack_frame(encode({"error": f"Game {game_id} is over"})))
+            writer.close()
+            report(SEAT_RELEASED, game_id, player_id)
+            return
+        await asyncio.wrap_future(server.occupy_seat(game_id, player_id, reused))
+        await server.serve_seat(reader, writer, player_id, game_id)
+
+    def on_handoff():
+        while True:
+            try:
+                data, fds, _, _ = socket.recv_fds(channel, HANDOFF.size, 1)
+            except BlockingIOError:
+                return
+            if not data:
+                loop.remove_reader(channel.fileno())
+                if not lobby_closed.done():
+                    lobby_closed.set_result(None)
+                return
+            game_id, player_id, table_size, stakes, reused = HANDOFF.unpack(data)
+            task = loop.create_task(start_seat(game_id, player_id, table_size, stakes, reused, fds[0]))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+
+    loop.add_reader(channel.fileno(), on_handoff)
+    print(f"Worker {index} (pid {os.getpid()}) ready")
+    await lobby_closed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sharded Texas Hold'em poker server")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="number of worker processes running tables")
+    parser.add_argument("--host", default=server.server)
+    parser.add_argument("--port", type=int, default=server.port)
+    parser.add_argument("--backlog", type=int, default=server.BACKLOG,
+                        help="listen() accept backlog")
+    parser.add_argument("--lookup-cache", metavar="PATH",
+                        help=f"hand evaluator table cache file (default: ${CACHE_ENV})")
+    parser.add_argument("--table-size", type=int, default=server.MAX_PLAYERS,
+                        help="seats at tables created for joins that do not ask for a size")
+    parser.add_argument("--stakes", type=int, default=server.STAKES,
+                        help="big blind of tables created for joins that do not ask for stakes")
+    parser.add_argument("--hand-log", metavar="PATH", help="record hands to PATH.<worker index>")
+    parser.add_argument("--fsync-interval", type=float, default=0.05,
+                        help="seconds between group commits of the hand history")
+    args = parser.parse_args()
+
+    if not 2 <= args.table_size <= server.MAX_SEATS or args.stakes < 2:
+        parser.error(f"--table-size must be 2 to {server.MAX_SEATS} and --stakes at least 2")
+    # The lobby's defaults for joins; workers get each table's size and stakes with its seats
+    server.seats.table_size, server.seats.stakes = args.table_size, args.stakes
+    # Built before forking, so every worker starts with the evaluator tables ready
+    get_evaluator(args.lookup_cache)
+    lobby = Lobby(args.workers, (args.hand_log, args.fsync_interval) if args.hand_log else None)
+    lobby.start_workers()
+    try:
+        asyncio.run(lobby.serve(args.host, args.port, args.backlog))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
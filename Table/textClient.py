@@ -1,12 +1,13 @@
 #!/usr/bin/env python3
 
 import socket
-import pickle
 import sys
 import time
 import threading
 import os
-import treys
+from evaluator import get_evaluator
+from framing import FrameReader, send_frame
+from protocol import encode, decode
 
 SERVER_IP = "192.168.196.52"
 SERVER_PORT = 23345
@@ -28,7 +29,7 @@ def get_emoji(card):
 
 
 def calculateHandStrength(player_cards, community_cards):
-    evaluator = treys.Evaluator()
+    evaluator = get_evaluator()
     if len(player_cards) + len(community_cards) >= 5:
         score = evaluator.evaluate(player_cards, community_cards)
         strength = evaluator.get_rank_class(score)
@@ -40,17 +41,21 @@ def calculateHandStrength(player_cards, community_cards):
 class PokerClient:
     def __init__(self):
         self.socket = None
+        self.reader = None
         self.player_id = None
         self.current_state = None
         self.running = True
         self.last_display_time = 0
         self.auto_refresh = True
+        self.state_updated = threading.Event()
 
     def connect(self):
         self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.reader = FrameReader(self.socket)
         try:
             self.socket.connect((SERVER_IP, SERVER_PORT))
             print(f"Connected to server at {SERVER_IP}:{SERVER_PORT}\n")
+            self._send_data({"action": "join"})  # Ask for a seat
 
             # Get initial response with player_id
             response = self._receive_data()
@@ -68,41 +73,53 @@ class PokerClient:
         self.socket.close()
     def _send_data(self, data):
         try:
-            self.socket.sendall(pickle.dumps(data))
+            send_frame(self.socket, encode(data))
         except Exception as e:
             print(f"Error sending data: {e}")
             self.running = False
 
     def _receive_data(self):
         try:
-            response_data = self.socket.recv(4096)
+            response_data = self.reader.read_frame()
             if not response_data:
                 print("Server connection closed.")
                 self.running = False
                 return None
-            return pickle.loads(response_data)
+            return decode(response_data)
         except Exception as e:
             print(f"Error receiving data: {e}")
             self.running = False
             return None
 
+    def _request_state(self, data, timeout=5):
+        """Send a request and wait until the listener thread has stored the next state."""
+        self.state_updated.clear()
+        self._send_data(data)
+        return self.state_updated.wait(timeout)
+
     def refresh_state(self):
-        self._send_data({"action": "get_state"})
-        state = self._receive_data()
-        if state:
-            self.current_state = state
-            return True
-        return False
+        since = self.current_state.get('version') if self.current_state else None
+        return self._request_state({"action": "get_state", "since": since})
 
-    def auto_refresh_thread(self):
+    def push_listener_thread(self):
+        """Consume the state updates the server pushes after every change at our table."""
         while self.running:
+            state = self._receive_data()
+            if not state:
+                break
+            if "error" in state:
+                print(f"Server error: {state['error']}")
+                self.state_updated.set()  # The reply to our request: nothing changed
+                continue
+            if state.get("unchanged"):
+                # Our snapshot is still current
+                self.state_updated.set()
+                continue
+            self.current_state = state
+            self.state_updated.set()
             if self.auto_refresh:
-                current_time = time.time()
-                if current_time - self.last_display_time >= 2:  # Refresh every 2 seconds
-                    if self.refresh_state():
-                        self.display_state()
-                        self.last_display_time = current_time
-            time.sleep(0.5)
+                self.display_state()
+                self.last_display_time = time.time()
 
     def display_state(self):
         if not self.current_state:
@@ -182,25 +199,24 @@ class PokerClient:
                 print("❌ Invalid amount!")
                 return
 
-        self._send_data({
+        updated = self._request_state({
             "action": "player_action",
             "move": action,
             "amount": amount
         })
 
-        state = self._receive_data()
-        if state:
-            self.current_state = state
+        if updated and not self.auto_refresh:
             self.display_state()
 
     def run(self):
         if not self.connect():
             return
 
-        # Start auto-refresh thread
-        refresh_thread = threading.Thread(target=self.auto_refresh_thread)
-        refresh_thread.daemon = True
-        refresh_thread.start()
+        # Start listening for pushed state, then subscribe to our table
+        listener_thread = threading.Thread(target=self.push_listener_thread)
+        listener_thread.daemon = True
+        listener_thread.start()
+        self._send_data({"action": "subscribe"})
 
         print("\nType 'h' for help\n")
 
@@ -223,7 +239,7 @@ Commands:
 """.format("ON" if self.auto_refresh else "OFF"))
 
                 elif command in ['r', 'refresh']:
-                    if self.refresh_state():
+                    if self.refresh_state() and not self.auto_refresh:
                         self.display_state()
 
                 elif command in ['p', 'play']: